@@ -0,0 +1,89 @@
+"""
+Memory/latency comparison of the two attendance layouts in src.attendance.
+
+Fills EVENTS events with CHECKINS check-ins each, once as Redis sets
+(ATTENDANCE_STORE=set) and once as bitmaps (ATTENDANCE_STORE=bitmap), then
+reports total MEMORY USAGE of the keys and per-call latency of a check-in,
+get_attendance_count and get_attendance (full member listing). Ids are drawn
+from [0, ID_SPACE), standing in for personIds; bitmap size grows with the
+largest id, not with the number of check-ins.
+
+Check-ins go straight to the layout (attendance._set_state without the log
+entry): nothing is written to the attendance:log stream the app flushes into
+MySQL, and the check-in latency is the layout's alone, without the XADD or
+roster check a real check-in adds on top.
+
+Needs a real Redis (REDIS_HOST/REDIS_PORT as for the app). Uses event ids
+starting at --base-event and deletes its keys afterwards.
+
+Usage (from project root):
+    python -m bench.bench_attendance_layouts [--events 20] [--checkins 20000] [--id-space 50000]
+"""
+import argparse
+import json
+import random
+import statistics
+import time
+
+import src.attendance as attendance
+
+
+def timed(samples, fn, *args):
+    start = time.perf_counter()
+    fn(*args)
+    samples.append((time.perf_counter() - start) * 1000)
+
+
+def run_layout(r, layout, event_ids, ids, reads):
+    attendance.ATTENDANCE_STORE = layout
+    keys = [attendance.attendance_key(event_id) for event_id in event_ids]
+    r.delete(*keys)
+
+    checkin_ms, count_ms, members_ms = [], [], []
+    for event_id in event_ids:
+        # Bulk load in one pipeline, then time single check-ins on top
+        with r.pipeline(transaction=False) as pipe:
+            for student_id in ids[:-reads]:
+                attendance._set_state(pipe, event_id, student_id, add=True, log=False)
+            pipe.execute()
+        for student_id in ids[-reads:]:
+            timed(checkin_ms, attendance._set_state, r, event_id, student_id, True, False)
+
+    for event_id in event_ids:
+        for _ in range(reads):
+            timed(count_ms, attendance.get_attendance_count, r, event_id)
+        timed(members_ms, attendance.get_attendance, r, event_id)
+
+    memory = sum(r.memory_usage(key) or 0 for key in keys)
+    r.delete(*keys)
+    return {
+        "layout": layout,
+        "keys": len(keys),
+        "memory_bytes": memory,
+        "bytes_per_checkin": round(memory / (len(keys) * len(ids)), 2),
+        "checkin_p50_ms": round(statistics.median(checkin_ms), 3),
+        "count_p50_ms": round(statistics.median(count_ms), 3),
+        "members_p50_ms": round(statistics.median(members_ms), 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=20)
+    parser.add_argument("--checkins", type=int, default=20000, help="check-ins per event")
+    parser.add_argument("--id-space", type=int, default=50000, help="largest personId + 1")
+    parser.add_argument("--reads", type=int, default=100, help="timed calls per event")
+    parser.add_argument("--base-event", type=int, default=900000)
+    args = parser.parse_args()
+
+    rng = random.Random(12345)
+    ids = rng.sample(range(args.id_space), args.checkins)
+    event_ids = list(range(args.base_event, args.base_event + args.events))
+
+    r = attendance.redis_connect()
+    results = [run_layout(r, layout, event_ids, ids, min(args.reads, len(ids) - 1)) for layout in ("set", "bitmap")]
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,414 @@
+"""
+End-to-end load and latency benchmark for the REST and GraphQL endpoints.
+
+Drives the real FastAPI app from src/main.py (in-process through httpx's ASGI
+transport, with the app's startup/shutdown hooks, or a running server with
+--url) against the MySQL/Mongo/Redis configured in .env. Each scenario runs
+--ops operations with --concurrency in flight and reports throughput and
+p50/p95/p99 latency per operation. An operation is one request, or the
+whole request sequence for the multi-request scenarios (page loads, check-in
+bursts, end_event).
+
+Scenarios cover every GraphQL Query/Mutation field in custom_schema (the run
+warns if one is added without a scenario), the index.html page-load query
+mix, REST routes, check-in bursts and end_event finalization.
+
+--seed rebuilds MySQL from db/schema.sql + db/sampleData.sql (this DROPS the
+database), gives every event type a field list in Mongo and clears the
+Redis attendance state, so runs start from the same data. Results are
+written as JSON (--out); --compare prints p95 changes against an earlier run.
+
+Usage (from project root):
+    python -m bench.bench_endpoints [--seed] [--ops 200] [--concurrency 20]
+        [--scenario NAME ...] [--url http://localhost:8000]
+        [--out bench/results/run.json] [--compare bench/results/previous.json]
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import statistics
+import subprocess
+import time
+
+import httpx
+
+from bench.bench_executor import percentile
+from db.migrate import statements
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Ids from db/sampleData.sql
+MEETINGS = [101, 102, 103, 104, 105]
+STUDENTS = [4, 5, 6, 12, 13, 14]
+ADMIN_ID = 1
+# meetIds for events created (and deleted again) by the write scenarios
+BENCH_MEET_BASE = 900000
+
+_counter = itertools.count()
+
+
+def seed():
+    import mysql.connector
+    from dotenv import load_dotenv
+    from src.mongo_connect import connect_mongo, get_client
+    from src.attendance import redis_connect
+
+    load_dotenv()
+    cnx = mysql.connector.connect(user=os.getenv("USERNAME"), password=os.getenv("PASSWORD"), host=os.getenv("HOST"))
+    crs = cnx.cursor()
+    for name in ("schema.sql", "sampleData.sql"):
+        for stmt in statements(os.path.join(ROOT, "db", name)):
+            crs.execute(stmt)
+    cnx.commit()
+    crs.execute("SELECT typeId, typeName FROM eventType")
+    types = crs.fetchall()
+    crs.close()
+    cnx.close()
+
+    event_types, custom_data = connect_mongo()
+    event_types.delete_many({})
+    custom_data.delete_many({})
+    event_types.insert_many([{"typeId": type_id, "name": name,
+                              "fields": [{"name": "Notes", "type": "text"}, {"name": "Capacity", "type": "number"}]}
+                             for type_id, name in types])
+    get_client()
+
+    r = redis_connect()
+    keys = list(itertools.chain(r.scan_iter("event:*"), r.scan_iter("job:*"), r.scan_iter("cache:*")))
+    keys += ["events:open", "jobs:queue", "jobs:processing"]
+    r.delete(*keys)
+
+
+## OPERATIONS ##
+# Each takes the client and returns the responses it made, for error counting.
+
+def gql(query, variables=None):
+    async def op(client):
+        return [await client.post("/graphql", json={"query": query, "variables": variables or {}})]
+    return op
+
+
+def gql_vars(query, make_variables):
+    async def op(client):
+        return [await client.post("/graphql", json={"query": query, "variables": make_variables()})]
+    return op
+
+
+def rest(method, path, make_body=None):
+    async def op(client):
+        return [await client.request(method, path, json=make_body() if make_body else None)]
+    return op
+
+
+def next_meeting():
+    return MEETINGS[next(_counter) % len(MEETINGS)]
+
+
+def next_student():
+    return STUDENTS[next(_counter) % len(STUDENTS)]
+
+
+PEOPLE_QUERY = "{ students { personId firstName lastName grade } volunteers { personId firstName lastName } admins { personId firstName lastName } guardians { personId firstName lastName } }"
+EVENTS_QUERY = "{ events { meetId title startDate endDate } }"
+
+
+async def page_load(client):
+    """index.html initial load plus opening the events page."""
+    return list(await asyncio.gather(
+        client.post("/graphql", json={"query": PEOPLE_QUERY}),
+        client.post("/graphql", json={"query": EVENTS_QUERY}),
+    ))
+
+
+EVENT_PAGE_QUERY = """query EventPage($id: Int!, $admin: Boolean!) {
+  event(meetId: $id) {
+    meetId title location startDate endDate
+    signups { id signeeId signee { personId firstName lastName } }
+    liveAttendance
+    pastAttendance @include(if: $admin) { signeeId status }
+    customData { values }
+  }
+}"""
+
+
+async def event_details(client):
+    """index.html showEventDetails for an admin: one nested event query."""
+    return [await client.post("/graphql", json={"query": EVENT_PAGE_QUERY,
+                                                "variables": {"id": next_meeting(), "admin": True}})]
+
+
+async def people_batched(client):
+    """The people lists plus the events list as one batched POST."""
+    return [await client.post("/graphql", json=[
+        {"query": "{ students { personId firstName lastName grade } }"},
+        {"query": "{ volunteers { personId firstName lastName } }"},
+        {"query": "{ admins { personId firstName lastName } }"},
+        {"query": "{ guardians { personId firstName lastName } }"},
+        {"query": "{ events { meetId title startDate endDate } }"},
+    ])]
+
+
+async def event_details_separate(client):
+    """The same page as separate queries: events + signups, then attendance."""
+    meet_id = next_meeting()
+    responses = list(await asyncio.gather(
+        client.post("/graphql", json={"query": "{ events { meetId title location startDate endDate } }"}),
+        client.post("/graphql", json={"query": "query GetSignups($id: Int!) { signups(meetingId: $id) { id signeeId } }",
+                                      "variables": {"id": meet_id}}),
+    ))
+    responses += list(await asyncio.gather(
+        client.post("/graphql", json={"query": "query GetPastAtt($id: Int!) { pastAttendance(eventId: $id) { signeeId status } }",
+                                      "variables": {"id": meet_id}}),
+        client.post("/graphql", json={"query": "query GetAtt($id: Int!) { attendance(eventId: $id) }",
+                                      "variables": {"id": meet_id}}),
+    ))
+    return responses
+
+
+async def checkin_burst(client):
+    """A kiosk scanning a whole roster: one REST check-in per student, concurrently."""
+    meet_id = next_meeting()
+    return list(await asyncio.gather(*[client.post("/attendance/checkin", json={"event_id": meet_id, "student_id": s})
+                                       for s in STUDENTS]))
+
+
+async def checkin_batch_burst(client):
+    """The same burst through one batch request."""
+    meet_id = next_meeting()
+    return [await client.post("/attendance/batch/checkin",
+                              json=[{"event_id": meet_id, "student_id": s} for s in STUDENTS])]
+
+
+async def checkin_checkout_gql(client):
+    meet_id, student = next_meeting(), next_student()
+    variables = {"e": meet_id, "s": student}
+    return [
+        await client.post("/graphql", json={"query": "mutation($e: Int!, $s: Int!) { checkin(eventId: $e, studentId: $s) }", "variables": variables}),
+        await client.post("/graphql", json={"query": "mutation($e: Int!, $s: Int!) { checkout(eventId: $e, studentId: $s) }", "variables": variables}),
+        await client.post("/graphql", json={"query": "mutation($i: [AttendanceInput!]!) { checkinBatch(items: $i) { changed signedUp } }",
+                                            "variables": {"i": [{"eventId": meet_id, "studentId": s} for s in STUDENTS]}}),
+        await client.post("/graphql", json={"query": "mutation($i: [AttendanceInput!]!) { checkoutBatch(items: $i) { changed } }",
+                                            "variables": {"i": [{"eventId": meet_id, "studentId": s} for s in STUDENTS]}}),
+    ]
+
+
+async def end_event(client):
+    """
+    Full finalization of a fresh event: create it, sign up and open the
+    roster, check everyone in, then end it and poll the job until it is done.
+    """
+    meet_id = BENCH_MEET_BASE + next(_counter)
+    responses = [await client.post("/graphql", json={"query": CREATE_EVENT, "variables": {"data": event_input(meet_id)}})]
+    for student in STUDENTS:
+        responses.append(await client.post("/graphql", json={
+            "query": "mutation($m: Int!, $s: Int!, $by: Int!) { signUpForEvent(meetingId: $m, signeeId: $s, signedUpById: $by) { id } }",
+            "variables": {"m": meet_id, "s": student, "by": ADMIN_ID}}))
+    responses.append(await client.post("/graphql", json={"query": "mutation($e: Int!) { openEvent(eventId: $e) }", "variables": {"e": meet_id}}))
+    responses.append(await client.post("/attendance/batch/checkin", json=[{"event_id": meet_id, "student_id": s} for s in STUDENTS[:-1]]))
+    responses.append(await client.post("/attendance/end_event", json={"event_id": meet_id}))
+    job_id = responses[-1].json().get("id")
+    while True:
+        responses.append(await client.get(f"/jobs/{job_id}"))
+        if responses[-1].status_code != 200 or responses[-1].json()["status"] in ("done", "failed"):
+            break
+        await asyncio.sleep(0.01)
+    responses.append(await client.post("/graphql", json={"query": "query($e: Int!) { pastAttendance(eventId: $e) { signeeId status } absent(eventId: $e) }",
+                                                         "variables": {"e": meet_id}}))
+    responses.append(await client.post("/graphql", json={"query": "query($j: String!) { job(jobId: $j) { status present absent } }",
+                                                         "variables": {"j": job_id}}))
+    responses.append(await client.post("/graphql", json={"query": "mutation($e: Int!) { endEvent(eventId: $e) { status } }",
+                                                         "variables": {"e": meet_id}}))
+    responses.append(await client.post("/graphql", json={"query": "mutation($m: Int!) { deleteEvent(meetId: $m) }", "variables": {"m": meet_id}}))
+    return responses
+
+
+CREATE_EVENT = "mutation($data: CreateEventInput!) { createEvent(eventData: $data) { meetId } }"
+
+
+def event_input(meet_id):
+    return {"meetId": meet_id, "title": f"Bench {meet_id}", "createdByID": ADMIN_ID, "typeId": 1,
+            "location": "Bench Hall", "startDate": "2030-01-01", "endDate": "2030-01-02",
+            "customValues": [{"fieldName": "Notes", "value": "bench"}, {"fieldName": "Capacity", "value": "40"}]}
+
+
+async def create_delete_event(client):
+    meet_id = BENCH_MEET_BASE + next(_counter)
+    return [
+        await client.post("/graphql", json={"query": CREATE_EVENT, "variables": {"data": event_input(meet_id)}}),
+        await client.post("/graphql", json={"query": "mutation($m: Int!) { deleteEvent(meetId: $m) }", "variables": {"m": meet_id}}),
+    ]
+
+
+async def signup_remove(client):
+    meet_id, student = next_meeting(), next_student()
+    response = await client.post("/graphql", json={
+        "query": "mutation($m: Int!, $s: Int!, $by: Int!) { signUpForEvent(meetingId: $m, signeeId: $s, signedUpById: $by) { id } }",
+        "variables": {"m": meet_id, "s": student, "by": ADMIN_ID}})
+    signup_id = ((response.json().get("data") or {}).get("signUpForEvent") or {}).get("id", 0)
+    return [response, await client.post("/graphql", json={"query": "mutation($i: Int!) { removeSignUp(signupId: $i) }",
+                                                           "variables": {"i": signup_id}})]
+
+
+# name -> (operation, GraphQL root fields it exercises)
+SCENARIOS = {
+    "gql_students": (gql("{ students { personId firstName lastName grade } }"), {"students"}),
+    "gql_volunteers": (gql("{ volunteers { personId firstName lastName } }"), {"volunteers"}),
+    "gql_admins": (gql("{ admins { personId firstName lastName } }"), {"admins"}),
+    "gql_guardians": (gql("{ guardians { personId firstName lastName } }"), {"guardians"}),
+    "gql_pages": (gql("{ studentsPage(first: 50) { items { personId } pageInfo { endCursor hasNextPage } }"
+                      " volunteersPage(first: 50) { items { personId } pageInfo { endCursor } }"
+                      " adminsPage(first: 50) { items { personId } pageInfo { endCursor } }"
+                      " guardiansPage(first: 50) { items { personId } pageInfo { endCursor } }"
+                      " eventsPage(first: 50) { items { meetId } pageInfo { endCursor } }"
+                      " signupsPage(meetingId: 101, first: 50) { items { id } pageInfo { endCursor } } }"),
+                  {"studentsPage", "volunteersPage", "adminsPage", "guardiansPage", "eventsPage", "signupsPage"}),
+    "gql_event_types": (gql("{ eventTypes { typeId typeName description fields { name type } } }"), {"eventTypes"}),
+    "gql_events": (gql("{ events { meetId title location startDate endDate type } }"), {"events"}),
+    "gql_event": (gql_vars("query($m: Int!) { event(meetId: $m) { meetId title location } }", lambda: {"m": next_meeting()}), {"event"}),
+    "gql_signups": (gql_vars("query($m: Int!) { signups(meetingId: $m) { id signeeId } }", lambda: {"m": next_meeting()}), {"signups"}),
+    "gql_attendance": (gql_vars("query($e: Int!) { attendance(eventId: $e) absent(eventId: $e) }", lambda: {"e": next_meeting()}),
+                       {"attendance", "absent"}),
+    "gql_past_attendance": (gql_vars("query($e: Int!) { pastAttendance(eventId: $e) { signeeId status } }", lambda: {"e": next_meeting()}),
+                            {"pastAttendance"}),
+    "gql_create_event_type": (gql_vars("mutation($n: String!) { createEventType(eventTypeData: {name: $n, fields: [{name: \"Notes\", type: \"text\"}]}) { typeId } }",
+                                       lambda: {"n": f"Bench type {next(_counter)}"}), {"createEventType"}),
+    "gql_create_delete_event": (create_delete_event, {"createEvent", "deleteEvent"}),
+    "gql_signup_remove": (signup_remove, {"signUpForEvent", "removeSignUp"}),
+    "gql_checkin_checkout": (checkin_checkout_gql, {"checkin", "checkout", "checkinBatch", "checkoutBatch"}),
+    "rest_people": (rest("GET", "/people/students?limit=50"), set()),
+    "rest_events_active": (rest("GET", "/events/get_active?limit=50", lambda: {"event_id": 0}), set()),
+    "rest_signees": (rest("GET", "/events/get_signees", lambda: {"event_id": next_meeting()}), set()),
+    "rest_attendance_count": (rest("GET", "/attendance/get_count", lambda: {"event_id": next_meeting()}), set()),
+    "page_load": (page_load, set()),
+    "event_details": (event_details, set()),
+    "event_details_separate": (event_details_separate, set()),
+    "people_batched": (people_batched, set()),
+    "checkin_burst": (checkin_burst, set()),
+    "checkin_batch_burst": (checkin_batch_burst, set()),
+    "end_event": (end_event, {"createEvent", "signUpForEvent", "openEvent", "endEvent", "job", "absent", "pastAttendance", "deleteEvent"}),
+}
+
+
+def uncovered_fields():
+    from src.graphql_schema.schema import custom_schema
+    schema = custom_schema._schema
+    fields = set(schema.query_type.fields) | set(schema.mutation_type.fields)
+    covered = set().union(*(fields_ for _, fields_ in SCENARIOS.values()))
+    return sorted(fields - covered)
+
+
+def failed(response):
+    if response.status_code >= 400:
+        return True
+    if response.headers.get("content-type", "").startswith("application/json") and response.request.url.path == "/graphql":
+        body = response.json()
+        return any(result.get("errors") for result in (body if isinstance(body, list) else [body]))
+    return False
+
+
+async def run_scenario(client, name, op, n_ops, concurrency):
+    limit = asyncio.Semaphore(concurrency)
+    latencies, errors = [], 0
+
+    async def one():
+        nonlocal errors
+        async with limit:
+            start = time.perf_counter()
+            try:
+                responses = await op(client)
+                errors += any(failed(response) for response in responses)
+            except Exception:
+                errors += 1
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[one() for _ in range(n_ops)])
+    elapsed = time.perf_counter() - start
+    return {
+        "scenario": name,
+        "ops": n_ops,
+        "errors": errors,
+        "throughput_ops": round(n_ops / elapsed, 1),
+        "mean_ms": round(statistics.mean(latencies), 2),
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+    }
+
+
+async def run(args, names):
+    if args.url:
+        transport, base_url = None, args.url
+    else:
+        from src.main import app
+        transport, base_url = httpx.ASGITransport(app=app), "http://bench"
+
+    results = []
+    async with httpx.AsyncClient(transport=transport, base_url=base_url, timeout=60) as client:
+        for name in names:
+            op = SCENARIOS[name][0]
+            await run_scenario(client, name, op, min(args.concurrency, args.ops), args.concurrency)  # warm-up
+            results.append(await run_scenario(client, name, op, args.ops, args.concurrency))
+            print(json.dumps(results[-1]))
+    return results
+
+
+def compare(results, previous_path):
+    with open(previous_path) as f:
+        previous = {row["scenario"]: row for row in json.load(f)["results"]}
+    print(f"\np95 vs {previous_path}:")
+    for row in results:
+        old = previous.get(row["scenario"])
+        if old:
+            change = (row["p95_ms"] - old["p95_ms"]) / old["p95_ms"] * 100 if old["p95_ms"] else 0
+            print(f"  {row['scenario']:<26} {old['p95_ms']:>9.2f} -> {row['p95_ms']:>9.2f} ms  ({change:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seed", action="store_true", help="rebuild MySQL from schema.sql + sampleData.sql first (drops the DB)")
+    parser.add_argument("--ops", type=int, default=200, help="operations per scenario")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--scenario", nargs="*", choices=sorted(SCENARIOS), help="default: all")
+    parser.add_argument("--url", help="benchmark a running server instead of the in-process app")
+    parser.add_argument("--out", help="write results JSON here")
+    parser.add_argument("--compare", help="earlier results JSON to compare p95 against")
+    args = parser.parse_args()
+
+    missing = uncovered_fields()
+    if missing:
+        print(f"warning: GraphQL fields without a scenario: {', '.join(missing)}")
+    if args.seed:
+        seed()
+
+    if not args.url:
+        # Run the app's own startup/shutdown: pools, executor, log flusher, job workers
+        from src.main import startup_event, shutdown_event
+        startup_event()
+    try:
+        results = asyncio.run(run(args, args.scenario or list(SCENARIOS)))
+    finally:
+        if not args.url:
+            shutdown_event()
+
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, cwd=ROOT).stdout.strip()
+    except OSError:
+        commit = None
+    report = {
+        "meta": {"time": time.strftime("%Y-%m-%dT%H:%M:%S"), "commit": commit, "url": args.url or "in-process",
+                 "ops": args.ops, "concurrency": args.concurrency, "seeded": args.seed},
+        "results": results,
+    }
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
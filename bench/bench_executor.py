@@ -0,0 +1,105 @@
+"""
+Concurrency benchmark for the blocking-call execution model.
+
+Runs an in-process FastAPI app where "slow" requests block for SLOW_MS (standing
+in for a slow MySQL query) while "fast" requests block for FAST_MS. It measures
+fast-request latency while slow requests are in flight, once with the blocking
+call made directly inside `async def` (the old behaviour) and once through
+src.db_executor.run_blocking.
+
+Usage (from project root):
+    python -m bench.bench_executor [--slow 50] [--fast 200] [--slow-ms 250] [--fast-ms 2]
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+
+import httpx
+from fastapi import FastAPI
+
+from src.db_executor import run_blocking
+
+
+def build_app(slow_ms, fast_ms):
+    app = FastAPI()
+
+    def slow_query():
+        time.sleep(slow_ms / 1000)
+
+    def fast_query():
+        time.sleep(fast_ms / 1000)
+
+    @app.get("/inline/slow")
+    async def inline_slow():
+        slow_query()
+
+    @app.get("/inline/fast")
+    async def inline_fast():
+        fast_query()
+
+    @app.get("/offload/slow")
+    async def offload_slow():
+        await run_blocking(slow_query)
+
+    @app.get("/offload/fast")
+    async def offload_fast():
+        await run_blocking(fast_query)
+
+    return app
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def timed_get(client, path, arrived, samples):
+    # All requests arrive together, so latency is measured from the shared
+    # arrival time rather than from when this coroutine first got scheduled.
+    await client.get(path)
+    samples.append((time.perf_counter() - arrived) * 1000)
+
+
+async def run_mode(app, mode, n_slow, n_fast):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        slow, fast = [], []
+        start = time.perf_counter()
+        await asyncio.gather(
+            *[timed_get(client, f"/{mode}/slow", start, slow) for _ in range(n_slow)],
+            *[timed_get(client, f"/{mode}/fast", start, fast) for _ in range(n_fast)],
+        )
+        elapsed = time.perf_counter() - start
+    return {
+        "mode": mode,
+        "requests": n_slow + n_fast,
+        "throughput_rps": round((n_slow + n_fast) / elapsed, 1),
+        "fast_p50_ms": round(statistics.median(fast), 2),
+        "fast_p99_ms": round(percentile(fast, 99), 2),
+        "slow_p50_ms": round(statistics.median(slow), 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--slow", type=int, default=50, help="concurrent slow requests")
+    parser.add_argument("--fast", type=int, default=200, help="concurrent fast requests")
+    parser.add_argument("--slow-ms", type=float, default=250)
+    parser.add_argument("--fast-ms", type=float, default=2)
+    args = parser.parse_args()
+
+    # Let the benchmark queue everything it sends; DB_THREADS still applies.
+    # Set here rather than at import, so modules borrowing helpers from this
+    # one (bench_endpoints) keep the app's real DB_QUEUE_DEPTH.
+    os.environ.setdefault("DB_QUEUE_DEPTH", "100000")
+    app = build_app(args.slow_ms, args.fast_ms)
+    results = [asyncio.run(run_mode(app, mode, args.slow, args.fast)) for mode in ("inline", "offload")]
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
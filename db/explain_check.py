@@ -0,0 +1,97 @@
+"""
+EXPLAIN regression check for the hot MySQL queries.
+
+Runs EXPLAIN on each query below against the configured database and fails
+(exit code 1) if any table in a plan is read with a full table scan
+(type ALL). Full index scans (type index) are fine for the list endpoints,
+which page through a primary key with LIMIT.
+
+Every table scan fails by default. On a nearly empty table MySQL may prefer
+a table scan even when an index fits, so run the check against the
+db.scale_data dataset, where plans match production. --min-rows N turns
+scans of tables estimated below N rows into warnings, for a quick look at a
+small development database.
+
+Usage (from project root, after python -m db.migrate):
+    python -m db.scale_data --reset
+    python -m db.explain_check [--min-rows N]
+"""
+import argparse
+import sys
+
+from src.mysql_connect import sql_connection
+from src.queries import (ATTENDANCE_COUNTS_SQL, EVENT_COLUMNS, PAST_ATTENDANCE_SQL, UNMARKED_ABSENTS_SQL,
+                         event_select, events_sql, people_sql, roster_absents_sql, signups_sql)
+
+
+def hot_queries(meeting_id, signee_id):
+    """
+    (name, sql, params) for each hot query, with ids that exist in the data.
+    Most come from src.queries, as the app runs them; the open_event roster
+    and attendance log lookups mirror attendance.py and attendance_log.py.
+    INSERT ... SELECT statements are checked through their SELECT.
+    """
+    queries = [
+        ("/events/get_active", *events_sql("get_active", meeting_id, 50)),
+        ("/events/get_signees", *events_sql("get_signees", meeting_id, 50)),
+        ("/events/get_author", *events_sql("get_author", meeting_id)),
+        ("/people/students", *people_sql("students", 50)),
+        ("/people/volunteers", *people_sql("volunteers", 50)),
+        ("/people/admins", *people_sql("admins", 50)),
+        ("Query.signups", *signups_sql(meeting_id, 50, 0)),
+        ("Query.event (every field)", event_select(tuple(EVENT_COLUMNS)) + " WHERE e.meetId = %s", (meeting_id,)),
+        ("Query.pastAttendance", PAST_ATTENDANCE_SQL, (meeting_id,)),
+        ("end_event absents (open event)", *roster_absents_sql(meeting_id, [signee_id])),
+        ("end_event absents (closed event)", UNMARKED_ABSENTS_SQL, (meeting_id,)),
+        ("end_event counts", ATTENDANCE_COUNTS_SQL, (meeting_id,)),
+    ]
+    queries += [
+        ("open_event roster",
+         "SELECT signeeId FROM MeetingSignUpItem WHERE meetingId = %s",
+         (meeting_id,)),
+        ("attendance log signup lookup",
+         "SELECT meetingId, signeeId, id FROM MeetingSignUpItem WHERE (meetingId, signeeId) IN ((%s, %s))",
+         (meeting_id, signee_id)),
+    ]
+    return queries
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--min-rows", type=int, default=0,
+                        help="tables estimated below this many rows only warn on a table scan (default: none)")
+    args = parser.parse_args()
+
+    failures = 0
+    with sql_connection() as cnx:
+        crs = cnx.cursor(dictionary=True)
+        crs.execute("SELECT meetingId, signeeId FROM MeetingSignUpItem ORDER BY id LIMIT 1")
+        sample = crs.fetchone()
+        if sample is None:
+            print("MeetingSignUpItem is empty; load some data first")
+            sys.exit(1)
+
+        for name, sql, params in hot_queries(sample["meetingId"], sample["signeeId"]):
+            crs.execute("EXPLAIN " + sql, params)
+            problems = []
+            for row in crs.fetchall():
+                if row["type"] != "ALL":
+                    continue
+                # For a table scan, rows is the optimizer's estimate of the table size
+                if (row["rows"] or 0) >= args.min_rows:
+                    problems.append(f"FAIL table scan on {row['table']} (possible keys: {row['possible_keys']})")
+                    failures += 1
+                else:
+                    problems.append(f"warn table scan on {row['table']} (~{row['rows']} rows, too small to judge)")
+            print(f"{'FAIL' if any(p.startswith('FAIL') for p in problems) else 'ok  '}  {name}")
+            for problem in problems:
+                print(f"      {problem}")
+        crs.close()
+
+    if failures:
+        print(f"{failures} table scan(s) on hot queries")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
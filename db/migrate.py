@@ -0,0 +1,79 @@
+"""
+Applies the versioned SQL files in db/migrations/ that the database has not
+seen yet, in order, recording each in schema_migrations.
+
+Files are named NNN_description.sql; NNN is the version. A fresh database
+built from schema.sql already lists every migration folded into it. MySQL
+commits DDL immediately, so a migration that fails halfway stops the run and
+has to be finished or undone by hand before running again.
+
+Usage (from project root):
+    python -m db.migrate            apply pending migrations
+    python -m db.migrate --status   list applied and pending migrations
+"""
+import argparse
+import os
+import re
+
+from src.mysql_connect import sql_connection
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(__file__), "migrations")
+MIGRATION_FILE = re.compile(r"^(\d+)_.+\.sql$")
+
+
+def migration_files():
+    files = []
+    for name in os.listdir(MIGRATIONS_DIR):
+        match = MIGRATION_FILE.match(name)
+        if match:
+            files.append((int(match.group(1)), name))
+    return sorted(files)
+
+
+def statements(path):
+    """
+    Splits a SQL file into statements: drops whole-line -- and # comments and
+    splits on semicolons at the end of a line.
+    """
+    with open(path) as f:
+        lines = [line for line in f if not line.lstrip().startswith(("--", "#"))]
+    return [stmt.strip() for stmt in re.split(r";\s*$", "".join(lines), flags=re.M) if stmt.strip()]
+
+
+def applied_versions(crs):
+    crs.execute("""
+                CREATE TABLE IF NOT EXISTS schema_migrations(
+                    version INT PRIMARY KEY,
+                    name VARCHAR(100) NOT NULL,
+                    appliedAt DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+                )
+                """)
+    crs.execute("SELECT version FROM schema_migrations")
+    return {version for (version,) in crs.fetchall()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--status", action="store_true", help="only list migrations")
+    args = parser.parse_args()
+
+    with sql_connection() as cnx:
+        crs = cnx.cursor()
+        applied = applied_versions(crs)
+        for version, name in migration_files():
+            if version in applied:
+                print(f"  applied  {name}")
+                continue
+            if args.status:
+                print(f"  pending  {name}")
+                continue
+            print(f"  applying {name}")
+            for stmt in statements(os.path.join(MIGRATIONS_DIR, name)):
+                crs.execute(stmt)
+            crs.execute("INSERT INTO schema_migrations (version, name) VALUES (%s, %s)", (version, name))
+            cnx.commit()
+        crs.close()
+
+
+if __name__ == "__main__":
+    main()
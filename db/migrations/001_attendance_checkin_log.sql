@@ -0,0 +1,19 @@
+-- Brings an existing database in line with schema.sql for the attendance log
+-- write-behind: one attendanceItem row per signup, keyed by
+-- MeetingSignUpItem.id, with check-in/check-out times.
+--
+-- Rows written by the old end_event stored the signee's personId in signupId
+-- and cannot be mapped back to a signup, so they are copied to
+-- attendanceItem_legacy before the table is cleared.
+
+CREATE TABLE attendanceItem_legacy AS SELECT * FROM attendanceItem;
+
+ALTER TABLE attendanceItem DROP FOREIGN KEY attendanceItem_ibfk_1;
+DELETE FROM attendanceItem;
+
+ALTER TABLE attendanceItem
+    ADD COLUMN checkInTime DATETIME(3) NULL,
+    ADD COLUMN checkOutTime DATETIME(3) NULL,
+    ADD UNIQUE (signupId),
+    ADD FOREIGN KEY (signupId) REFERENCES MeetingSignUpItem(id)
+    ON DELETE CASCADE;
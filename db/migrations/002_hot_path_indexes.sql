@@ -0,0 +1,24 @@
+-- Keys and indexes for the hot read paths. Each line names the queries it
+-- serves; db/explain_check.py verifies none of them falls back to a table scan.
+--
+-- Student, Volunteer and Admin are one row per person (like Guardian), and
+-- Event is one row per Meeting, so their personId/meetId become primary keys.
+-- This fails if existing data has duplicates; remove them first.
+-- attendanceItem(signupId) is already UNIQUE since 001.
+
+-- /people/{ep}, students/volunteers/admins queries: join on personId
+ALTER TABLE Student ADD PRIMARY KEY (personId);
+ALTER TABLE Volunteer ADD PRIMARY KEY (personId);
+ALTER TABLE Admin ADD PRIMARY KEY (personId);
+
+-- Query.event, events, /events/get_author: join/lookup on meetId
+ALTER TABLE Event ADD PRIMARY KEY (meetId);
+
+-- /events/get_active: endDate range
+CREATE INDEX idx_event_end_date ON Event (endDate);
+
+-- open_event, the attendance log flush: (meetingId, signeeId) lookups.
+-- signups, get_signees, pastAttendance, end_event: meetingId filter paged or
+-- joined by id. MySQL drops the implicit meetingId FK index once these exist.
+CREATE INDEX idx_signup_meeting_signee ON MeetingSignUpItem (meetingId, signeeId);
+CREATE INDEX idx_signup_meeting_id ON MeetingSignUpItem (meetingId, id);
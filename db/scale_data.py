@@ -0,0 +1,327 @@
+"""
+Deterministic scale dataset generator and bulk loader for MySQL and Mongo.
+
+Generates people (split into admins, guardians, volunteers and students),
+meetings (mostly events, the rest small groups), event types, signups,
+attendance for events that ended before --anchor, and the matching Mongo
+eventTypes/eventCustomData documents. Everything is consistent with
+db/schema.sql. The same --seed and volumes always produce the same data.
+
+Rows are streamed, never held in memory, and loaded with batched multi-row
+INSERTs (--method insert) or LOAD DATA LOCAL INFILE from temporary CSV files
+(--method load-data, needs local_infile enabled on the server). Mongo
+documents go in with unordered insert_many batches.
+
+The target tables must be empty; --reset rebuilds the database from
+db/schema.sql first (this DROPS it).
+
+Usage (from project root):
+    python -m db.scale_data --reset [--persons 1000000] [--meetings 100000]
+        [--signups 10000000] [--event-types 20] [--seed 42]
+        [--method insert|load-data] [--batch 5000]
+"""
+import argparse
+import csv
+import os
+import random
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+import mysql.connector
+from dotenv import load_dotenv
+
+from db.migrate import statements
+from src.mongo_connect import bootstrap_indexes, connect_mongo
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+FIRST_NAMES = ["Emily", "Michael", "Sophia", "Daniel", "Ava", "Jacob", "Olivia", "Ethan", "Grace", "Henry",
+               "Lily", "Lucas", "Chloe", "Noah", "Zoe", "Mia", "Liam", "Ella", "Mason", "Aria"]
+LAST_NAMES = ["Johnson", "Smith", "Lee", "Martinez", "Davis", "Brown", "Garcia", "Wilson", "Miller", "Anderson",
+              "Thompson", "White", "Harris", "Taylor", "Clark", "Lewis", "Walker", "Young", "King", "Scott"]
+TITLES = ["Parent Night", "Volunteer Training", "Small Group", "Fundraiser", "Celebration", "Retreat",
+          "Lock-in", "Service Day", "Game Night", "Worship Night"]
+LOCATIONS = ["Main Hall", "Gymnasium", "Library", "Room B", "Courtyard", "Park Pavilion", "Chapel", "Cafeteria"]
+FIELD_TYPES = ["text", "number", "boolean"]
+
+
+class Volumes:
+    """
+    Id layout: persons 1..persons, with admins first, then guardians,
+    volunteers and students; the rest have no role. Meetings 1..meetings;
+    every fifth one is a small group, the others events.
+    """
+    def __init__(self, args):
+        self.seed = args.seed
+        self.persons = args.persons
+        self.meetings = args.meetings
+        self.signups = args.signups
+        self.event_types = args.event_types
+        self.anchor = date.fromisoformat(args.anchor)
+
+        self.admins = max(1, args.persons // 100)
+        self.guardians = max(1, args.persons * 15 // 100)
+        self.volunteers = max(1, args.persons * 10 // 100)
+        self.students = max(1, args.persons * 60 // 100)
+        self.guardian_start = self.admins + 1
+        self.volunteer_start = self.guardian_start + self.guardians
+        self.student_start = self.volunteer_start + self.volunteers
+        if self.student_start + self.students - 1 > self.persons:
+            raise SystemExit("--persons is too small for the role split")
+
+    def rng(self, *key):
+        return random.Random(f"{self.seed}:{':'.join(map(str, key))}")
+
+    def guardian_of(self, student_id):
+        return self.guardian_start + (student_id * 2654435761) % self.guardians
+
+    def is_event(self, meet_id):
+        return meet_id % 5 != 0
+
+    def event_dates(self, meet_id):
+        rng = self.rng("event", meet_id)
+        start = self.anchor + timedelta(days=rng.randint(-730, 365))
+        return start, start + timedelta(days=rng.choice([0, 0, 0, 1, 2]))
+
+    def event_type(self, meet_id):
+        return 1 + (meet_id * 40503) % self.event_types
+
+    def type_fields(self, type_id):
+        rng = self.rng("type", type_id)
+        return [{"name": f"Field {type_id}.{i}", "type": rng.choice(FIELD_TYPES)} for i in range(rng.randint(1, 5))]
+
+
+## ROW GENERATORS ##
+# Each yields tuples in the column order of its TABLES entry.
+
+def person_rows(v):
+    rng = v.rng("person")
+    for person_id in range(1, v.persons + 1):
+        yield person_id, rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+
+def guardian_rows(v):
+    for person_id in range(v.guardian_start, v.guardian_start + v.guardians):
+        yield (person_id,)
+
+def student_rows(v):
+    for person_id in range(v.student_start, v.student_start + v.students):
+        yield person_id, v.guardian_of(person_id), str(1 + person_id % 9)
+
+def volunteer_rows(v):
+    for person_id in range(v.volunteer_start, v.volunteer_start + v.volunteers):
+        yield (person_id,)
+
+def admin_rows(v):
+    for person_id in range(1, v.admins + 1):
+        yield (person_id,)
+
+def meeting_rows(v):
+    rng = v.rng("meeting")
+    for meet_id in range(1, v.meetings + 1):
+        yield meet_id, f"{rng.choice(TITLES)} {meet_id}"
+
+def event_type_rows(v):
+    for type_id in range(1, v.event_types + 1):
+        yield type_id, f"Type {type_id}", f"Generated event type {type_id}"
+
+def event_rows(v):
+    rng = v.rng("event-rows")
+    for meet_id in range(1, v.meetings + 1):
+        if v.is_event(meet_id):
+            start, end = v.event_dates(meet_id)
+            yield meet_id, rng.randint(1, v.admins), v.event_type(meet_id), rng.choice(LOCATIONS), start, end
+
+def small_group_rows(v):
+    for meet_id in range(1, v.meetings + 1):
+        if not v.is_event(meet_id):
+            yield meet_id, v.anchor + timedelta(days=meet_id % 14)
+
+def _signups(v):
+    """
+    (signupId, signeeId, signedUpById, meetingId): signups spread evenly over
+    meetings, each signee at most once per meeting, drawn from students and
+    volunteers. Students are signed up by their guardian, volunteers by
+    themselves.
+    """
+    signee_count = v.students + v.volunteers
+    per_meeting, extra = divmod(v.signups, v.meetings)
+    if per_meeting + (extra > 0) > signee_count:
+        raise SystemExit("--signups is too large: more signups per meeting than signees")
+    signup_id = 0
+    for meet_id in range(1, v.meetings + 1):
+        count = per_meeting + (meet_id <= extra)
+        for index in v.rng("signups", meet_id).sample(range(signee_count), count):
+            signee = v.volunteer_start + index
+            signed_up_by = v.guardian_of(signee) if signee >= v.student_start else signee
+            signup_id += 1
+            yield signup_id, signee, signed_up_by, meet_id
+
+def signup_rows(v):
+    yield from _signups(v)
+
+def attendance_rows(v):
+    """
+    One row per signup of an event that ended before the anchor date: 80%
+    Present with check-in/out times, the rest Absent.
+    """
+    rng = v.rng("attendance")
+    for signup_id, _, _, meet_id in _signups(v):
+        if not v.is_event(meet_id):
+            continue
+        start, end = v.event_dates(meet_id)
+        if end >= v.anchor:
+            continue
+        if rng.random() < 0.8:
+            check_in = datetime.combine(start, datetime.min.time()) + timedelta(hours=18, minutes=rng.randint(0, 45))
+            yield signup_id, "Present", check_in, check_in + timedelta(hours=2, minutes=rng.randint(0, 60))
+        else:
+            yield signup_id, "Absent", None, None
+
+# Load order respects foreign keys; columns match db/schema.sql
+TABLES = [
+    ("Person", ("personId", "firstName", "lastName"), person_rows),
+    ("Guardian", ("personId",), guardian_rows),
+    ("Student", ("personId", "guardianId", "grade"), student_rows),
+    ("Volunteer", ("personId",), volunteer_rows),
+    ("Admin", ("personId",), admin_rows),
+    ("Meeting", ("meetId", "title"), meeting_rows),
+    ("eventType", ("typeId", "typeName", "description"), event_type_rows),
+    ("Event", ("meetId", "createdByID", "typeId", "location", "startDate", "endDate"), event_rows),
+    ("smallGroup", ("meetId", "nextMeetingDate"), small_group_rows),
+    ("MeetingSignUpItem", ("id", "signeeId", "signedUpById", "meetingId"), signup_rows),
+    ("attendanceItem", ("signupId", "STATUS", "checkInTime", "checkOutTime"), attendance_rows),
+]
+
+
+## MONGO DOCUMENTS ##
+def event_type_docs(v):
+    for type_id in range(1, v.event_types + 1):
+        yield {"typeId": type_id, "name": f"Type {type_id}", "fields": v.type_fields(type_id)}
+
+def custom_data_docs(v):
+    fields = {type_id: v.type_fields(type_id) for type_id in range(1, v.event_types + 1)}
+    rng = v.rng("custom")
+    for meet_id in range(1, v.meetings + 1):
+        if not v.is_event(meet_id):
+            continue
+        type_id = v.event_type(meet_id)
+        values = {}
+        for field in fields[type_id]:
+            if field["type"] == "number":
+                values[field["name"]] = rng.randint(0, 500)
+            elif field["type"] == "boolean":
+                values[field["name"]] = rng.random() < 0.5
+            else:
+                values[field["name"]] = rng.choice(LOCATIONS)
+        yield {"meetId": meet_id, "typeId": type_id, "values": values}
+
+
+## LOADERS ##
+def batches(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def load_insert(cnx, table, columns, rows, batch_size):
+    # executemany rewrites each batch into one multi-row INSERT
+    sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))})"
+    crs = cnx.cursor()
+    count = 0
+    for batch in batches(rows, batch_size):
+        crs.executemany(sql, batch)
+        cnx.commit()
+        count += len(batch)
+    crs.close()
+    return count
+
+def load_data_infile(cnx, table, columns, rows, batch_size):
+    count = 0
+    with tempfile.NamedTemporaryFile("w", suffix=f"_{table}.csv", newline="", delete=False) as f:
+        writer = csv.writer(f)
+        for row in rows:
+            # With ESCAPED BY '' the bare word NULL loads as NULL
+            writer.writerow(["NULL" if value is None else value for value in row])
+            count += 1
+        path = f.name
+    try:
+        crs = cnx.cursor()
+        crs.execute(f"""
+                    LOAD DATA LOCAL INFILE %s INTO TABLE {table}
+                    FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '"' ESCAPED BY ''
+                    LINES TERMINATED BY '\\r\\n'
+                    ({', '.join(columns)})
+                    """, (path,))
+        cnx.commit()
+        crs.close()
+    finally:
+        os.remove(path)
+    return count
+
+def load_mongo(collection, docs, batch_size):
+    count = 0
+    for batch in batches(docs, batch_size):
+        collection.insert_many(batch, ordered=False)
+        count += len(batch)
+    return count
+
+
+def timed(label, fn, *args):
+    start = time.perf_counter()
+    count = fn(*args)
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<20} {count:>11,} rows  {elapsed:8.1f}s  {count / elapsed if elapsed else 0:>10,.0f} rows/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--persons", type=int, default=1_000_000)
+    parser.add_argument("--meetings", type=int, default=100_000)
+    parser.add_argument("--signups", type=int, default=10_000_000)
+    parser.add_argument("--event-types", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--anchor", default="2026-01-01", help="'today' for the generated dates (attendance exists before it)")
+    parser.add_argument("--method", choices=["insert", "load-data"], default="insert")
+    parser.add_argument("--batch", type=int, default=5000, help="rows per INSERT / documents per insert_many")
+    parser.add_argument("--reset", action="store_true", help="rebuild the database from db/schema.sql first (drops it)")
+    args = parser.parse_args()
+    v = Volumes(args)
+
+    load_dotenv()
+    cnx = mysql.connector.connect(user=os.getenv("USERNAME"), password=os.getenv("PASSWORD"), host=os.getenv("HOST"),
+                                  allow_local_infile=args.method == "load-data")
+    crs = cnx.cursor()
+    if args.reset:
+        for stmt in statements(os.path.join(ROOT, "db", "schema.sql")):
+            crs.execute(stmt)
+    crs.execute(f"USE {os.getenv('DB')}")
+    crs.execute("SELECT COUNT(*) FROM Person")
+    if crs.fetchone()[0]:
+        raise SystemExit("Person is not empty; load into an empty database or pass --reset")
+    # Rows are generated consistent with the keys, so skip per-row checks
+    crs.execute("SET SESSION foreign_key_checks = 0")
+    crs.execute("SET SESSION unique_checks = 0")
+    crs.close()
+
+    load = load_insert if args.method == "insert" else load_data_infile
+    print(f"MySQL ({args.method}):")
+    for table, columns, rows in TABLES:
+        timed(table, load, cnx, table, columns, rows(v), args.batch)
+    cnx.close()
+
+    event_types, custom_data = connect_mongo()
+    event_types.delete_many({})
+    custom_data.delete_many({})
+    bootstrap_indexes()
+    print("Mongo:")
+    timed("eventTypes", load_mongo, event_types, event_type_docs(v), args.batch)
+    timed("eventCustomData", load_mongo, custom_data, custom_data_docs(v), args.batch)
+
+
+if __name__ == "__main__":
+    main()
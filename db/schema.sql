@@ -17,7 +17,7 @@ CREATE TABLE Guardian(
 );
 
 CREATE TABLE Student(
-    personId INT,
+    personId INT PRIMARY KEY,
     guardianId INT NOT NULL,
     grade CHAR(1) NOT NULL,
     FOREIGN KEY (personId) REFERENCES Person(personId)
@@ -27,13 +27,13 @@ CREATE TABLE Student(
 );
 
 CREATE TABLE Volunteer(
-    personId INT,
+    personId INT PRIMARY KEY,
     FOREIGN KEY (personId) REFERENCES Person(personId)
     ON DELETE CASCADE
 );
 
 CREATE TABLE Admin(
-    personId INT,
+    personId INT PRIMARY KEY,
     FOREIGN KEY (personId) REFERENCES Person(personId)
     ON DELETE CASCADE
 );
@@ -48,6 +48,8 @@ CREATE TABLE MeetingSignUpItem(
     signeeId INT NOT NULL,
     signedUpById INT NOT NULL,
     meetingId INT NOT NULL,
+    INDEX idx_signup_meeting_signee (meetingId, signeeId),
+    INDEX idx_signup_meeting_id (meetingId, id),
     FOREIGN KEY (signedUpById) REFERENCES Person(personId)
     ON DELETE RESTRICT,
     FOREIGN KEY (signeeId) REFERENCES Person(personId)
@@ -69,9 +71,11 @@ CREATE TABLE NoteItem(
 
 CREATE TABLE attendanceItem(
     id INT PRIMARY KEY AUTO_INCREMENT,
-    signupId INT NOT NULL,
+    signupId INT NOT NULL UNIQUE,
     STATUS VARCHAR(10) NOT NULL,
-    FOREIGN KEY (signupId) REFERENCES MeetingSignUpItem(signeeId)
+    checkInTime DATETIME(3) NULL,
+    checkOutTime DATETIME(3) NULL,
+    FOREIGN KEY (signupId) REFERENCES MeetingSignUpItem(id)
     ON DELETE CASCADE
 );
 
@@ -88,12 +92,13 @@ CREATE TABLE eventType(
 );
 
 CREATE TABLE Event(
-    meetId INT NOT NULL,
+    meetId INT PRIMARY KEY,
     createdByID INT NOT NULL,
     typeId INT NOT NULL,
     location VARCHAR(100) NOT NULL,
     startDate DATE NOT NULL,
     endDate DATE NOT NULL,
+    INDEX idx_event_end_date (endDate),
     FOREIGN KEY (meetID) REFERENCES Meeting(meetId)
     ON DELETE CASCADE,
     FOREIGN KEY (createdByID) REFERENCES Person(personId)
@@ -101,3 +106,12 @@ CREATE TABLE Event(
     FOREIGN KEY (typeId) REFERENCES eventType(typeId)
 );
 
+-- Migrations in db/migrations/ already folded into this file
+CREATE TABLE schema_migrations(
+    version INT PRIMARY KEY,
+    name VARCHAR(100) NOT NULL,
+    appliedAt DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+INSERT INTO schema_migrations (version, name) VALUES
+(1, '001_attendance_checkin_log.sql'),
+(2, '002_hot_path_indexes.sql');
@@ -1,28 +1,294 @@
 # @author Ryan Magnuson <rmagnuson@westmont.edu>
 
 import redis
-import mysql.connector
+import threading
 import os
-from src.mysql_connect import connect_sql
+from dotenv import load_dotenv
+from redis.client import NEVER_DECODE, Pipeline
+from src.mysql_connect import sql_connection
+from src.attendance_log import log_entry, drain_log
+from src.queries import roster_absents_sql, UNMARKED_ABSENTS_SQL, ATTENDANCE_COUNTS_SQL
+from src.metrics import InstrumentedRedis
+
+load_dotenv()
+
+# "set" keeps event:{id}:checkedIn as a set of student ids. "bitmap" keeps
+# event:{id}:checkedInBits with bit <personId> set, which is far smaller for
+# big events. Switch modes only between events: each mode reads its own key.
+ATTENDANCE_STORE = os.getenv("ATTENDANCE_STORE", "set")
+
+# Events whose signee roster has been loaded into event:{id}:roster by
+# open_event. Check-ins for these events are validated against the roster.
+OPEN_EVENTS = "events:open"
+
+class NotSignedUp(Exception):
+    """
+    Raised when checking in a student who is not on an open event's roster.
+    """
+
+_redis_pool = None
+_redis_lock = threading.Lock()
 
 def redis_connect():
+    """
+    Returns a client backed by the process-wide ConnectionPool, so sockets are
+    reused across requests instead of being opened per call.
+    """
+    global _redis_pool
     try:
-        return redis.Redis(
-                host=os.getenv("REDIS_HOST"),
-                port=int(os.getenv("REDIS_PORT")),
-                username='default',
-                password=os.getenv("REDIS_PASS"),
-                # ssl=True,
-                decode_responses=True
-            )
+        with _redis_lock:
+            if _redis_pool is None:
+                load_dotenv()
+                _redis_pool = redis.ConnectionPool(
+                    host=os.getenv("REDIS_HOST"),
+                    port=int(os.getenv("REDIS_PORT")),
+                    username='default',
+                    password=os.getenv("REDIS_PASS"),
+                    # ssl=True,
+                    decode_responses=True,
+                    max_connections=int(os.getenv("REDIS_POOL_SIZE", "50")),
+                    socket_keepalive=True,
+                    health_check_interval=30
+                )
+        return InstrumentedRedis(connection_pool=_redis_pool)
     except Exception as e:
         print(f"An exception occurred connecting to Redis: {e}")
 
+def redis_pool_stats():
+    """
+    Snapshot of the shared Redis pool: configured max, sockets in use and idle.
+    """
+    with _redis_lock:
+        pool = _redis_pool
+    if pool is None:
+        return {}
+    return {"size": pool.max_connections, "in_use": len(pool._in_use_connections),
+            "idle": len(pool._available_connections)}
+
+def close_redis():
+    global _redis_pool
+    with _redis_lock:
+        if _redis_pool is not None:
+            _redis_pool.disconnect()
+            _redis_pool = None
+
+# The read helpers below take either a client or a pipeline as `r`. Given a
+# pipeline, the command is only queued and the result comes back from
+# pipe.execute(), so several calls share one round trip:
+#
+#     with r.pipeline(transaction=False) as pipe:
+#         get_attendance(pipe, event_id, student_id)
+#         get_attendance_count(pipe, event_id)
+#         attending, count = pipe.execute()
+#
+# Bitmap mode exception: listing members with get_attendance(r, event_id)
+# needs a client, since the raw bitmap has to be read without decoding.
+#
+# checkin/checkout also take a pipeline: the state change and its attendance
+# log entry are queued on it (two replies per call, the change's first) and
+# the roster of an open event is checked beforehand with a separate read.
+# Given a client they run their own MULTI so both land together. The *_many
+# variants need a client.
+
+def attendance_key(event_id):
+    if ATTENDANCE_STORE == "bitmap":
+        return f"event:{event_id}:checkedInBits"
+    return f"event:{event_id}:checkedIn"
+
+def roster_key(event_id):
+    return f"event:{event_id}:roster"
+
+def decode_bitmap(raw):
+    """
+    Turns a Redis bitmap (bit 0 = most significant bit of the first byte)
+    into the set of offsets that are set, as strings like SMEMBERS returns.
+    """
+    members = set()
+    for byte_index, byte in enumerate(raw or b""):
+        if byte:
+            for bit in range(8):
+                if byte & (0x80 >> bit):
+                    members.add(str(byte_index * 8 + bit))
+    return members
+
+# SETBIT replies with the previous bit; checkin reports 1 for a new check-in
+# in both layouts, like SADD, so bitmap mode flips that reply server-side.
+_SETBIT_NEW = "return 1 - redis.call('SETBIT', KEYS[1], ARGV[1], 1)"
+
+def _set_state(pipe, event_id, student_id, add, log=True):
+    if ATTENDANCE_STORE == "bitmap" and add:
+        pipe.eval(_SETBIT_NEW, 1, attendance_key(event_id), int(student_id))
+    elif ATTENDANCE_STORE == "bitmap":
+        pipe.setbit(attendance_key(event_id), int(student_id), 0)
+    elif add:
+        pipe.sadd(attendance_key(event_id), student_id)
+    else:
+        pipe.srem(attendance_key(event_id), student_id)
+    if log:
+        log_entry(pipe, event_id, student_id, "in" if add else "out")
+
+def open_event(r, event_id):
+    """
+    Snapshots the meeting's signees into event:{id}:roster, replacing any
+    earlier snapshot, and marks the event open. From then on check-ins are
+    validated and absents computed in Redis alone; signUpForEvent and
+    removeSignUp keep the roster current. Returns the roster size.
+    """
+    with sql_connection() as cnx:
+        crs = cnx.cursor()
+        crs.execute("""
+                    SELECT signeeId
+                    FROM MeetingSignUpItem
+                    WHERE meetingId = %s
+                    """, (event_id,))
+        signees = [signeeId for (signeeId,) in crs.fetchall()]
+        crs.close()
+
+    with r.pipeline(transaction=True) as pipe:
+        pipe.delete(roster_key(event_id))
+        if signees:
+            pipe.sadd(roster_key(event_id), *signees)
+        pipe.sadd(OPEN_EVENTS, event_id)
+        pipe.execute()
+    return len(set(signees))
+
+def roster_add(r, event_id, signee_id):
+    """
+    Adds a new signee to the roster if the event is open.
+    """
+    if r.sismember(OPEN_EVENTS, event_id):
+        r.sadd(roster_key(event_id), signee_id)
+
+def roster_remove(r, event_id, signee_id):
+    r.srem(roster_key(event_id), signee_id)
+
+def _on_roster(r, items):
+    """
+    One round trip telling, per (event_id, student_id) item, whether it may be
+    checked in: always for events that were never opened, otherwise only if
+    the student is on the roster.
+    """
+    by_event = {}
+    for event_id, student_id in items:
+        by_event.setdefault(event_id, []).append(student_id)
+
+    with r.pipeline(transaction=False) as pipe:
+        for event_id, members in by_event.items():
+            pipe.sismember(OPEN_EVENTS, event_id)
+            pipe.smismember(roster_key(event_id), members)
+        replies = pipe.execute()
+
+    allowed = {}
+    for (event_id, members), is_open, flags in zip(by_event.items(), replies[0::2], replies[1::2]):
+        for student_id, flag in zip(members, flags):
+            allowed[(event_id, student_id)] = not is_open or bool(flag)
+    return [allowed[item] for item in items]
+
+def get_absent(r, event_id):
+    """
+    Signees of an open event who are not checked in, as strings like
+    SMEMBERS returns. One SDIFF in set mode; in bitmap mode the roster is
+    diffed against the decoded bitmap.
+    """
+    if ATTENDANCE_STORE == "bitmap":
+        return r.smembers(roster_key(event_id)) - get_attendance(r, event_id)
+    return r.sdiff(roster_key(event_id), attendance_key(event_id))
+
+def _client(r):
+    """
+    A client on the same connection pool as `r`, for reads that cannot wait
+    until a pipeline executes.
+    """
+    if isinstance(r, Pipeline):
+        return InstrumentedRedis(connection_pool=r.connection_pool)
+    return r
+
+def _change_state(r, event_id, student_id, add):
+    if isinstance(r, Pipeline):
+        _set_state(r, event_id, student_id, add)
+        return r
+    with r.pipeline(transaction=True) as pipe:
+        _set_state(pipe, event_id, student_id, add)
+        return pipe.execute()[0]
+
 def checkin(r, event_id, student_id):
-    r.sadd(f"event:{event_id}:checkedIn", student_id)
+    """
+    Checks a student in. Returns 1 if they were newly checked in, 0 if they
+    already were, whichever ATTENDANCE_STORE is in use.
+    """
+    if not _on_roster(_client(r), [(event_id, str(student_id))])[0]:
+        raise NotSignedUp(f"Student {student_id} is not signed up for event {event_id}")
+    return _change_state(r, event_id, student_id, add=True)
 
 def checkout(r, event_id, student_id):
-    r.srem(f"event:{event_id}:checkedIn", student_id)
+    """
+    Checks a student out. Returns 1 if they had been checked in, else 0.
+    """
+    return _change_state(r, event_id, student_id, add=False)
+
+def _apply_many(r, items, add):
+    """
+    Applies many (event_id, student_id) check-ins or check-outs in one round
+    trip: a single multi-member SADD/SREM per event, each preceded by an
+    SMISMEMBER so every item can report whether it changed anything. In
+    bitmap mode each item is one SETBIT, whose reply is the previous bit.
+    Every item is also appended to the attendance log.
+    """
+    items = [(int(event_id), str(student_id)) for event_id, student_id in items]
+    by_event = {}
+    for event_id, student_id in items:
+        by_event.setdefault(event_id, []).append(student_id)
+
+    was_member = {}
+    with r.pipeline(transaction=True) as pipe:
+        if ATTENDANCE_STORE == "bitmap":
+            for event_id, student_id in items:
+                pipe.setbit(attendance_key(event_id), int(student_id), 1 if add else 0)
+            for event_id, student_id in items:
+                log_entry(pipe, event_id, student_id, "in" if add else "out")
+            for item, old_bit in zip(items, pipe.execute()):
+                was_member.setdefault(item, bool(old_bit))
+        else:
+            for event_id, members in by_event.items():
+                key = attendance_key(event_id)
+                pipe.smismember(key, members)
+                if add:
+                    pipe.sadd(key, *members)
+                else:
+                    pipe.srem(key, *members)
+            for event_id, student_id in items:
+                log_entry(pipe, event_id, student_id, "in" if add else "out")
+            replies = pipe.execute()[:2 * len(by_event)]
+            for (event_id, members), flags in zip(by_event.items(), replies[0::2]):
+                for student_id, flag in zip(members, flags):
+                    was_member[(event_id, student_id)] = bool(flag)
+
+    # Only the first occurrence of a repeated item can change anything
+    results, seen = [], set()
+    for item in items:
+        changed = item not in seen and was_member[item] != add
+        seen.add(item)
+        results.append(changed)
+    return results
+
+def checkin_many(r, items):
+    """
+    Checks in every (event_id, student_id) pair. Returns one value per item:
+    True if that student was newly checked in, False if they already were,
+    None if the event is open and they are not on its roster (skipped).
+    """
+    items = [(int(event_id), str(student_id)) for event_id, student_id in items]
+    allowed = _on_roster(r, items)
+    accepted = [item for item, ok in zip(items, allowed) if ok]
+    changed = iter(_apply_many(r, accepted, add=True) if accepted else [])
+    return [next(changed) if ok else None for ok in allowed]
+
+def checkout_many(r, items):
+    """
+    Checks out every (event_id, student_id) pair. Returns one bool per item:
+    True if that student had been checked in.
+    """
+    return _apply_many(r, items, add=False)
 
 def get_attendance(r, event_id, student_id=None):
     """
@@ -30,55 +296,71 @@ def get_attendance(r, event_id, student_id=None):
     OR whether or not a student is attending a particular event, if student_id
     is provided.
     """
+    if ATTENDANCE_STORE == "bitmap":
+        if student_id:
+            return r.getbit(attendance_key(event_id), int(student_id))
+        return decode_bitmap(r.execute_command("GET", attendance_key(event_id), **{NEVER_DECODE: True}))
     if student_id:
-        return r.sismember(f"event:{event_id}:checkedIn", student_id)
+        return r.sismember(attendance_key(event_id), student_id)
     else:
-        return r.smembers(f"event:{event_id}:checkedIn")
+        return r.smembers(attendance_key(event_id))
+
+def get_attendance_many(r, event_ids):
+    """
+    The attending students of several events (as get_attendance returns them),
+    in one round trip.
+    """
+    with r.pipeline(transaction=False) as pipe:
+        for event_id in event_ids:
+            if ATTENDANCE_STORE == "bitmap":
+                pipe.execute_command("GET", attendance_key(event_id), **{NEVER_DECODE: True})
+            else:
+                pipe.smembers(attendance_key(event_id))
+        results = pipe.execute()
+    if ATTENDANCE_STORE == "bitmap":
+        return [decode_bitmap(raw) for raw in results]
+    return results
 
 def get_attendance_count(r, event_id):
-    return r.scard(f"event:{event_id}:checkedIn")
+    if ATTENDANCE_STORE == "bitmap":
+        return r.bitcount(attendance_key(event_id))
+    return r.scard(attendance_key(event_id))
 
 def end_event(r, event_id):
-    def record_attendance(cnx, event_id, members):
-        crs = cnx.cursor()
-        # formatted = ', '.join([str(mem) for mem in members])
-        res = []
-        for mem in members:
-            crs.execute("""
-                        SELECT signeeId, meetingId
-                        FROM MeetingSignUpItem
-                        WHERE meetingId = %(event_id)s AND signeeId IN (%(mems)s)
-                        """, {'event_id': event_id,
-                              'mems': mem})
-            res.append(crs.fetchall()[0])
-
-        presents = [{'id': personId, 'stat': 'Present'} for (personId, meetingId) in res]
-
-        crs.execute("""
-                    SELECT signeeId, meetingId
-                    FROM MeetingSignUpItem
-                    WHERE meetingId = %(event_id)s
-                    """, {'event_id': event_id})
-        absents = [{'id': personId, 'stat': 'Absent'} for (personId, meetingId) in crs.fetchall() if {'id': personId, 'stat': 'Present'} not in presents]
-
-        attendance = presents + absents
-
-        # formatted = ', '.join([str((int(mem['id']), mem['stat'])) for mem in attendance])
-        for person in attendance:
-            crs.execute(f"""
-                            INSERT INTO attendanceItem (signupId, STATUS)
-                            VALUES
-                            (%s, %s)
-                            """, (person['id'], person['stat']))
-
-        cnx.commit()
-        crs.close()
-        cnx.close()
-
-    members = r.smembers(f"event:{event_id}:checkedIn")
+    """
+    Finalizes an event. Check-ins and check-outs have already been written
+    behind into attendanceItem by the log flusher, so this only drains what is
+    left of the log and records the remaining signees as Absent. For an open
+    event those come from the Redis roster (get_absent); otherwise one
+    INSERT ... SELECT finds signees without a row. The Redis keys are deleted
+    once MySQL has committed. Safe to run again: existing rows are never
+    overwritten.
+    """
+    drain_log(r)
+    is_open = r.sismember(OPEN_EVENTS, event_id)
+    absents = [int(signee) for signee in get_absent(r, event_id)] if is_open else None
 
-    # send to mysql
-    cnx = connect_sql()
-    record_attendance(cnx, event_id, members)
+    with sql_connection() as cnx:
+        crs = cnx.cursor()
+        try:
+            cnx.start_transaction()
+            if absents:
+                select_sql, params = roster_absents_sql(event_id, absents)
+                crs.execute("INSERT INTO attendanceItem (signupId, STATUS)" + select_sql
+                            + "ON DUPLICATE KEY UPDATE signupId = signupId", params)
+            elif absents is None:
+                crs.execute("INSERT INTO attendanceItem (signupId, STATUS)" + UNMARKED_ABSENTS_SQL, (event_id,))
+            crs.execute(ATTENDANCE_COUNTS_SQL, (event_id,))
+            counts = dict(crs.fetchall())
+            cnx.commit()
+        except Exception:
+            cnx.rollback()
+            raise
+        finally:
+            crs.close()
 
-    r.delete(f"event:{event_id}:checkedIn")
\ No newline at end of file
+    with r.pipeline(transaction=True) as pipe:
+        pipe.delete(attendance_key(event_id), roster_key(event_id))
+        pipe.srem(OPEN_EVENTS, event_id)
+        pipe.execute()
+    return {'present': counts.get('Present', 0), 'absent': counts.get('Absent', 0)}
@@ -0,0 +1,172 @@
+import os
+import socket
+import threading
+from datetime import datetime, timezone
+from dotenv import load_dotenv
+from redis.exceptions import ResponseError
+from src.mysql_connect import sql_connection
+
+load_dotenv()
+
+# Every check-in/check-out is appended to one Redis Stream in the same MULTI as
+# the attendance set/bitmap change. A consumer group drains it into
+# attendanceItem in small batches (write-behind), so MySQL holds each signee's
+# latest state and check-in/out times long before end_event runs. The stream
+# entry id is Redis server time, which becomes checkInTime/checkOutTime (UTC).
+LOG_STREAM = "attendance:log"
+LOG_GROUP = "attendance-flush"
+FLUSH_BATCH = int(os.getenv("ATTENDANCE_FLUSH_BATCH", "200"))
+FLUSH_BLOCK_MS = int(os.getenv("ATTENDANCE_FLUSH_BLOCK_MS", "1000"))
+# Entries a consumer read but never acknowledged (it crashed mid-batch) are
+# claimed by a live consumer once they have been pending this long.
+FLUSH_CLAIM_MS = int(os.getenv("ATTENDANCE_FLUSH_CLAIM_MS", "30000"))
+
+# An entry only changes a row if it is at least as new as the row's latest
+# check-in/check-out, so entries applied out of order (a batch claimed from a
+# crashed consumer after newer ones were flushed) cannot undo newer state.
+# Rows without times (finalized Absent) accept any entry.
+_IS_NEWER = """COALESCE(
+    COALESCE(VALUES(checkInTime), VALUES(checkOutTime))
+        >= GREATEST(COALESCE(checkInTime, checkOutTime), COALESCE(checkOutTime, checkInTime)),
+    TRUE)"""
+
+# One batch at a time per process, so finalize never races the flusher thread
+_flush_lock = threading.Lock()
+_flusher = None
+_stop = threading.Event()
+
+def log_entry(pipe, event_id, student_id, action):
+    """
+    Queues one log entry ("in" or "out") on a pipeline.
+    """
+    pipe.xadd(LOG_STREAM, {"event": event_id, "student": student_id, "action": action})
+
+def ensure_group(r):
+    try:
+        r.xgroup_create(LOG_STREAM, LOG_GROUP, id="0", mkstream=True)
+    except ResponseError as e:
+        if "BUSYGROUP" not in str(e):
+            raise
+
+def _entry_time(entry_id):
+    ms = int(entry_id.split("-")[0])
+    return datetime.fromtimestamp(ms / 1000, timezone.utc).replace(tzinfo=None)
+
+def write_entries(entries):
+    """
+    Applies stream entries to attendanceItem in one transaction. "in" marks
+    the signup Present and sets checkInTime, "out" marks it Absent and sets
+    checkOutTime; older entries than the row's latest time are ignored.
+    Replaying entries gives the same rows, so a batch that is retried after a
+    crash is harmless. Entries for people not signed up are dropped.
+    """
+    if not entries:
+        return 0
+    parsed = [(int(fields["event"]), int(fields["student"]), fields["action"], _entry_time(entry_id))
+              for entry_id, fields in entries]
+    pairs = sorted({(event_id, student_id) for event_id, student_id, _, _ in parsed})
+
+    with sql_connection() as cnx:
+        crs = cnx.cursor()
+        try:
+            cnx.start_transaction()
+            crs.execute(f"""
+                        SELECT meetingId, signeeId, id
+                        FROM MeetingSignUpItem
+                        WHERE (meetingId, signeeId) IN ({", ".join(["(%s, %s)"] * len(pairs))})
+                        """, tuple(value for pair in pairs for value in pair))
+            signup_ids = {(meeting_id, signee_id): signup_id for meeting_id, signee_id, signup_id in crs.fetchall()}
+
+            rows = []
+            for event_id, student_id, action, at in parsed:
+                signup_id = signup_ids.get((event_id, student_id))
+                if signup_id is None:
+                    continue
+                if action == "in":
+                    rows.append((signup_id, 'Present', at, None))
+                else:
+                    rows.append((signup_id, 'Absent', None, at))
+
+            if rows:
+                # Assignments run left to right and each entry sets only one
+                # of the two times, so the guard still sees the old times.
+                crs.executemany(f"""
+                                INSERT INTO attendanceItem (signupId, STATUS, checkInTime, checkOutTime)
+                                VALUES (%s, %s, %s, %s)
+                                ON DUPLICATE KEY UPDATE
+                                    STATUS = IF({_IS_NEWER}, VALUES(STATUS), STATUS),
+                                    checkOutTime = IF({_IS_NEWER}, COALESCE(VALUES(checkOutTime), checkOutTime), checkOutTime),
+                                    checkInTime = IF({_IS_NEWER}, COALESCE(VALUES(checkInTime), checkInTime), checkInTime)
+                                """, rows)
+            cnx.commit()
+        except Exception:
+            cnx.rollback()
+            raise
+        finally:
+            crs.close()
+    return len(rows)
+
+def flush_batch(r, consumer, block_ms=None, min_idle_ms=FLUSH_CLAIM_MS):
+    """
+    Flushes at most FLUSH_BATCH entries: first ones abandoned by other
+    consumers, otherwise new ones. Entries are acknowledged and deleted from
+    the stream only after the MySQL commit. Returns how many were handled,
+    counting claimed entries that had already been deleted (those are just
+    acknowledged).
+    """
+    with _flush_lock:
+        _, entries, *_ = r.xautoclaim(LOG_STREAM, LOG_GROUP, consumer, min_idle_ms, count=FLUSH_BATCH)
+        if not entries:
+            reply = r.xreadgroup(LOG_GROUP, consumer, {LOG_STREAM: ">"}, count=FLUSH_BATCH, block=block_ms)
+            entries = reply[0][1] if reply else []
+        if not entries:
+            return 0
+
+        # Entries deleted while pending come back without fields
+        write_entries([(entry_id, fields) for entry_id, fields in entries if fields])
+        ids = [entry_id for entry_id, _ in entries]
+        with r.pipeline(transaction=True) as pipe:
+            pipe.xack(LOG_STREAM, LOG_GROUP, *ids)
+            pipe.xdel(LOG_STREAM, *ids)
+            pipe.execute()
+        return len(entries)
+
+def drain_log(r):
+    """
+    Synchronously flushes everything in the stream, including entries still
+    pending for other consumers. Used by end_event before it finalizes.
+    """
+    ensure_group(r)
+    consumer = f"{_consumer_name()}-drain"
+    while flush_batch(r, consumer, min_idle_ms=0) or r.xpending(LOG_STREAM, LOG_GROUP)["pending"]:
+        pass
+
+def _consumer_name():
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+def _run_flusher(r):
+    consumer = _consumer_name()
+    while not _stop.is_set():
+        try:
+            flush_batch(r, consumer, block_ms=FLUSH_BLOCK_MS)
+        except Exception as e:
+            print(f"Attendance log flush failed: {e}")
+            _stop.wait(1)
+
+def start_log_flusher(r):
+    """
+    Starts the background write-behind thread. On restart the new consumer
+    picks up whatever a crashed one left pending after FLUSH_CLAIM_MS.
+    """
+    global _flusher
+    ensure_group(r)
+    _stop.clear()
+    _flusher = threading.Thread(target=_run_flusher, args=(r,), name="attendance-log-flusher", daemon=True)
+    _flusher.start()
+
+def stop_log_flusher():
+    global _flusher
+    _stop.set()
+    if _flusher is not None:
+        _flusher.join(timeout=(FLUSH_BLOCK_MS / 1000) + 5)
+        _flusher = None
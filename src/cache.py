@@ -0,0 +1,54 @@
+import json
+import os
+from dotenv import load_dotenv
+from src.attendance import redis_connect
+from src.metrics import CACHE_REQUESTS
+
+load_dotenv()
+
+EVENTS = "events"
+EVENTS_TTL = int(os.getenv("EVENTS_CACHE_TTL", "60"))
+
+# Read-through cache in Redis. Every namespace has a version counter that is
+# part of each key; writers bump the version instead of hunting down keys, so
+# readers never see results computed before the write. Old versions simply
+# expire through their TTL. Redis errors fall back to the loader.
+
+def _version_key(namespace):
+    return f"cache:{namespace}:version"
+
+def cached(namespace, key, loader, ttl=EVENTS_TTL):
+    """
+    Returns the JSON-serializable value for `key`, calling loader() and storing
+    the result on a miss.
+    """
+    try:
+        r = redis_connect()
+        version = r.get(_version_key(namespace)) or 0
+        full_key = f"cache:{namespace}:v{version}:{key}"
+        hit = r.get(full_key)
+        if hit is not None:
+            CACHE_REQUESTS.inc(namespace, "hit")
+            return json.loads(hit)
+    except Exception as e:
+        print(f"Cache read failed for {namespace}:{key}: {e}")
+        CACHE_REQUESTS.inc(namespace, "error")
+        return loader()
+
+    CACHE_REQUESTS.inc(namespace, "miss")
+
+    value = loader()
+    try:
+        r.set(full_key, json.dumps(value, default=str), ex=ttl)
+    except Exception as e:
+        print(f"Cache write failed for {namespace}:{key}: {e}")
+    return value
+
+def invalidate(namespace):
+    """
+    Bumps the namespace version so every cached entry in it is ignored.
+    """
+    try:
+        redis_connect().incr(_version_key(namespace))
+    except Exception as e:
+        print(f"Cache invalidation failed for {namespace}: {e}")
@@ -0,0 +1,93 @@
+import threading
+from typing import Optional, Union
+from pydantic import ConfigDict, Field, ValidationError, create_model
+from src.mongo_connect import connect_mongo
+from src.metrics import CACHE_REQUESTS
+
+# Declared FieldType -> Python type the value must validate as
+FIELD_TYPES = {
+    "text": str,
+    "number": Union[int, float],
+    "boolean": bool,
+}
+
+class CustomValueError(Exception):
+    """
+    Raised when submitted custom values do not match the event type's fields.
+    """
+
+# typeId -> (version it was compiled at, pydantic model). create_event_type
+# bumps _version, so every entry compiled before it gets rebuilt on next use.
+_validators = {}
+_version = 0
+_lock = threading.Lock()
+
+def compile_validator(type_id, fields) -> type:
+    """
+    Builds a pydantic model for an event type's custom fields. Every field is
+    optional; unknown names are rejected. Field names are used as aliases so
+    they do not have to be valid Python identifiers.
+    """
+    definitions = {}
+    for i, f in enumerate(fields):
+        field_type = FIELD_TYPES.get(f["type"], str)
+        definitions[f"field_{i}"] = (
+            Optional[field_type],
+            Field(default=None, alias=f["name"], json_schema_extra={"fieldType": f["type"]}),
+        )
+    return create_model(
+        f"EventType{type_id}Values",
+        __config__=ConfigDict(extra="forbid"),
+        **definitions,
+    )
+
+def register_event_type(type_id, fields) -> type:
+    """
+    Compiles and caches the validator for a new or changed event type and
+    invalidates validators compiled under the previous version.
+    """
+    global _version
+    model = compile_validator(type_id, fields)
+    with _lock:
+        _version += 1
+        _validators[type_id] = (_version, model)
+    return model
+
+def get_validator(type_id) -> Optional[type]:
+    """
+    Returns the cached validator for type_id, loading the field list from the
+    eventTypes collection only on a miss. None means the type is unknown.
+    """
+    with _lock:
+        entry = _validators.get(type_id)
+        version = _version
+    if entry and entry[0] == version:
+        CACHE_REQUESTS.inc("validators", "hit")
+        return entry[1]
+    CACHE_REQUESTS.inc("validators", "miss")
+
+    event_type_collection, _ = connect_mongo()
+    schema_doc = event_type_collection.find_one({"typeId": type_id}, {"_id": 0, "fields": 1})
+    if not schema_doc:
+        return None
+    model = compile_validator(type_id, schema_doc.get("fields", []))
+    with _lock:
+        _validators[type_id] = (version, model)
+    return model
+
+def validate_values(model, values: dict) -> dict:
+    """
+    Checks {fieldName: value} against a compiled validator and returns the
+    values coerced to their declared types.
+    """
+    try:
+        parsed = model.model_validate(values)
+    except ValidationError as e:
+        error = e.errors()[0]
+        name = error["loc"][0] if error["loc"] else ""
+        if error["type"] == "extra_forbidden":
+            raise CustomValueError(f"Unknown custom field for this event type: {name}")
+        declared = next((field.json_schema_extra["fieldType"] for field in model.model_fields.values()
+                         if field.alias == name), "value")
+        raise CustomValueError(f"Invalid value for custom field {name}: expected {declared}")
+    return parsed.model_dump(by_alias=True, exclude_unset=True)
@@ -0,0 +1,79 @@
+import asyncio
+import contextvars
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+from src.profiling import in_profile
+
+
+class ExecutorBusy(Exception):
+    """
+    Raised when more blocking calls are queued than DB_QUEUE_DEPTH allows.
+    main.py turns this into a 503 so callers can back off.
+    """
+
+
+_executor = None
+_executor_lock = threading.Lock()
+_workers = 0
+_queue_depth = 0
+_pending = 0  # only touched from the event loop thread
+
+
+def init_executor():
+    """
+    Builds the bounded thread pool that runs blocking MySQL/Mongo/Redis calls.
+    A worker may hold a MySQL connection, so MYSQL_POOL_SIZE has to cover
+    DB_THREADS plus the other holders listed in the README.
+    """
+    global _executor, _workers, _queue_depth
+    with _executor_lock:
+        if _executor is None:
+            load_dotenv()
+            _workers = int(os.getenv("DB_THREADS", "10"))
+            _queue_depth = int(os.getenv("DB_QUEUE_DEPTH", "100"))
+            _executor = ThreadPoolExecutor(max_workers=_workers, thread_name_prefix="db")
+        return _executor
+
+
+def shutdown_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=True)
+            _executor = None
+
+
+def stats():
+    return {"workers": _workers, "queue_depth": _queue_depth, "pending": _pending}
+
+
+async def run_blocking(fn, *args, **kwargs):
+    """
+    Runs fn(*args, **kwargs) on the DB thread pool and awaits the result,
+    keeping the event loop free. Context variables are carried into the worker,
+    and so is profiling when the request is being profiled (src/profiling.py).
+    """
+    global _pending
+    executor = init_executor()
+    if _pending >= _workers + _queue_depth:
+        raise ExecutorBusy(f"Too many queued database calls ({_pending})")
+    _pending += 1
+    try:
+        call = functools.partial(contextvars.copy_context().run, in_profile(fn), *args, **kwargs)
+        return await asyncio.get_running_loop().run_in_executor(executor, call)
+    finally:
+        _pending -= 1
+
+
+def offload(fn):
+    """
+    Decorator turning a blocking resolver into an async one that runs on the
+    DB thread pool. The wrapped signature is preserved for Strawberry.
+    """
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        return await run_blocking(fn, *args, **kwargs)
+    return wrapper
@@ -2,60 +2,16 @@ from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from typing import List, Literal, Optional, Any,Dict
 from datetime import date
-import os
 
-import mysql.connector
-from pymongo import MongoClient
-from dotenv import load_dotenv
+from src.mysql_connect import connect_sql
+from src.mongo_connect import connect_mongo
+from src.cache import invalidate, EVENTS
+from src.custom_fields import get_validator, register_event_type, validate_values, CustomValueError
 
 
 
 router = APIRouter()
 
-##ENV/ GLOBALS
-load_dotenv()
-
-USERNAME= os.getenv('USERNAME')
-PASSWORD= os.getenv('PASSWORD')
-HOST= os.getenv('HOST')
-DB=os.getenv('DB')
-MONGO_URI=os.getenv('MONGO_URI')
-
-
-
-##helper functions
-
-def connect_sql():
-    try:
-        return mysql.connector.connect(
-            user=USERNAME,
-            password=PASSWORD,
-            host=HOST,
-            database=DB
-        )
-    except Exception as e:
-        print(f"Error connecting to DB: {e}")
-
-def connect_mongo():
-    global mongo_client,mongo_db,event_type,custom_event
-    try:
-        mongo_client = MongoClient(MONGO_URI)
-        mongo_db = mongo_client["finalProj_workorder"]
-
-        # Collections
-        event_type = mongo_db["eventTypes"]
-        custom_event = mongo_db["eventCustomData"]
-
-        # Indexes
-        event_type.create_index("typeId", unique=True)
-        custom_event.create_index("meetId", unique=True)
-        custom_event.create_index("typeId")
-
-        print(" Connected to MongoDB")
-        return event_type, custom_event
-    except Exception as e:
-        print(f"Error connecting to MongoDB: {e}")
-
 
 
 ## Pydantic model
@@ -111,10 +67,8 @@ class SmallGroupResponse(BaseModel):
 @router.post("/event-types")
 def create_event_type(request: CustomFieldRequest):
 
-    cnx = connect_sql()
     event_type,_ = connect_mongo()
-
-
+    cnx = connect_sql()
 
     try:
         with cnx.cursor()as cur:
@@ -141,6 +95,7 @@ def create_event_type(request: CustomFieldRequest):
         event_type.insert_one(doc)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    register_event_type(type_id, doc["fields"])
 
     return CustomFieldResponse(
         id=type_id,
@@ -150,23 +105,19 @@ def create_event_type(request: CustomFieldRequest):
     )
 @router.post("/events")
 def create_event(request: CreateEventRequest):
-    cnx = connect_sql()
-    event_type,custom_event = connect_mongo()
+    _,custom_event = connect_mongo()
 
-    schema_doc = event_type.find_one({"typeId": request.typeId})
-    if not schema_doc:
+    # Cached per typeId, so the eventTypes lookup only happens on a miss
+    validator = get_validator(request.typeId)
+    if validator is None:
         raise HTTPException(status_code=400, detail="Unknown event typeId")
 
-    allowed_fields = {f["name"] for f in schema_doc.get("fields", [])}
-    for cv in request.customValues:
-        if cv.fieldName not in allowed_fields:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Unknown custom field for this event type: {cv.fieldName}",
-            )
-
-
+    try:
+        values_dict = validate_values(validator, {cv.fieldName: cv.value for cv in request.customValues})
+    except CustomValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
+    cnx = connect_sql()
     try:
         with cnx.cursor() as cur:
             cur.execute(
@@ -184,14 +135,13 @@ def create_event(request: CreateEventRequest):
                 ),
             )
         cnx.commit()
+        invalidate(EVENTS)
     except Exception as e:
         cnx.rollback()
         raise HTTPException(status_code=500, detail=str(e))
     finally:
         cnx.close()
 
-    values_dict= {cv.fieldName: cv.value for cv in request.customValues}
-
     mongo_doc={
         "meetId": request.meetId,
         "createdByID": request.createdByID,
@@ -211,7 +161,7 @@ def get_event_custom_data(meet_id: int):
     Fetch custom field values for a given event (by meetId).
     """
     _, custom_event = connect_mongo()
-    doc = custom_event.find_one({"meetId": meet_id})
+    doc = custom_event.find_one({"meetId": meet_id}, {"_id": 0, "meetId": 1, "typeId": 1, "values": 1})
     if not doc:
         raise HTTPException(status_code=404, detail="No custom data for this event")
 
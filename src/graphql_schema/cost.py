@@ -0,0 +1,276 @@
+import asyncio
+import math
+import os
+import time
+from dotenv import load_dotenv
+from graphql import (FieldNode, FragmentSpreadNode, GraphQLError, GraphQLList, InlineFragmentNode,
+                     OperationDefinitionNode, FragmentDefinitionNode, get_named_type, get_nullable_type,
+                     is_composite_type, value_from_ast_untyped)
+from graphql.execution import ExecutionResult as GraphQLExecutionResult
+from strawberry.extensions import SchemaExtension
+from src.graphql_schema.documents import LRUCache
+from src.metrics import COST_REJECTIONS, OPERATION_COST
+from src.pagination import clamp_page_size
+
+load_dotenv()
+
+# Static cost analysis, run after validation and before any resolver. Each
+# root field that hits a backend costs that backend's weight. Nested backend
+# fields are served by DataLoaders, one IN query per level however many
+# parents there are, so their weight is charged once per operation. Every
+# object returned adds OBJECT_COST, multiplied by the rows of each list above
+# it: its `first` argument (clamped and defaulted like the resolvers do), the
+# page size for `*Page { items }`, or GRAPHQL_COST_LIST_SIZE for the few
+# lists that take no `first` at all. The total is rounded up to a whole
+# point. Operations over
+# GRAPHQL_MAX_COST or GRAPHQL_MAX_DEPTH are rejected outright. Each client
+# (X-Client-Id header, else its address) also spends from a token bucket
+# refilled at GRAPHQL_CLIENT_BUDGET points per minute; a request that
+# overdraws it waits for the refill if that takes at most
+# GRAPHQL_THROTTLE_MAX_WAIT seconds and is rejected otherwise. The computed
+# cost is returned under extensions.cost.
+MAX_COST = int(os.getenv("GRAPHQL_MAX_COST", "20000"))
+MAX_DEPTH = int(os.getenv("GRAPHQL_MAX_DEPTH", "10"))
+LIST_SIZE = int(os.getenv("GRAPHQL_COST_LIST_SIZE", "100"))
+CLIENT_BUDGET = int(os.getenv("GRAPHQL_CLIENT_BUDGET", "100000"))
+THROTTLE_MAX_WAIT = float(os.getenv("GRAPHQL_THROTTLE_MAX_WAIT", "2"))
+CLIENT_HEADER = "x-client-id"
+
+# One backend call; Redis answers from memory in well under a millisecond
+BACKEND_COSTS = {"mysql": 10, "mongo": 10, "redis": 1}
+# Every object returned, for building and serialising it
+OBJECT_COST = 0.1
+# Root fields not listed here read (or write) MySQL; nested fields not listed
+# here are plain attributes
+FIELD_BACKENDS = {
+    "Query.eventTypes": ("mysql", "mongo"),
+    "Query.attendance": ("redis",),
+    "Query.absent": ("redis",),
+    "Query.job": ("redis",),
+    "Event.signups": ("mysql",),
+    "Event.liveAttendance": ("redis",),
+    "Event.pastAttendance": ("mysql",),
+    "Event.customData": ("mongo",),
+    "MeetingSignUpItem.signee": ("mysql",),
+    "MeetingSignUpItem.signedUpBy": ("mysql",),
+    "Mutation.createEventType": ("mysql", "mongo"),
+    "Mutation.createEvent": ("mysql", "mongo"),
+    "Mutation.checkin": ("redis",),
+    "Mutation.checkout": ("redis",),
+    "Mutation.checkinBatch": ("redis",),
+    "Mutation.checkoutBatch": ("redis",),
+    "Mutation.openEvent": ("redis", "mysql"),
+    "Mutation.endEvent": ("redis",),
+}
+ROOT_TYPES = ("Query", "Mutation")
+
+
+def field_weight(parent, name):
+    backends = FIELD_BACKENDS.get(f"{parent}.{name}")
+    if backends is None:
+        backends = ("mysql",) if parent in ROOT_TYPES else ()
+    return sum(BACKEND_COSTS[backend] for backend in backends)
+
+
+class CostAnalysis:
+    """
+    Walks one operation, following fragments and honouring @skip/@include,
+    and adds up its cost and depth. Introspection fields are free.
+
+    Selection sets are priced as (per_parent, batched, depth): per_parent is
+    paid once for each parent object and grows with the lists above it,
+    batched (the loader-backed fields' queries) is paid once in all.
+    """
+    def __init__(self, schema, document, variables):
+        self.schema = schema
+        self.variables = variables or {}
+        self.fragments = {d.name.value: d for d in document.definitions if isinstance(d, FragmentDefinitionNode)}
+
+    def operation(self, operation):
+        root = self.schema.get_root_type(operation.operation)
+        if root is None:
+            # e.g. a subscription; this schema has no such root type
+            return None
+        per_parent, batched, depth = self.selections(root, operation.selection_set, None, set())
+        return math.ceil(per_parent + batched), depth
+
+    def selections(self, parent_type, selection_set, page_size, visited):
+        """
+        (per_parent, batched, depth) of one selection set on parent_type.
+        page_size is the clamped `first` of a *Page field, which bounds its
+        `items`.
+        """
+        per_parent, batched, depth = 0, 0, 0
+        for selection in selection_set.selections:
+            if not self.included(selection):
+                continue
+            if isinstance(selection, FieldNode):
+                cost = self.field(parent_type, selection, page_size, visited)
+            elif isinstance(selection, InlineFragmentNode):
+                fragment_type = self.schema.get_type(selection.type_condition.name.value) if selection.type_condition else parent_type
+                cost = self.selections(fragment_type, selection.selection_set, page_size, visited)
+            elif isinstance(selection, FragmentSpreadNode):
+                name = selection.name.value
+                fragment = self.fragments.get(name)
+                if fragment is None or name in visited:
+                    continue
+                fragment_type = self.schema.get_type(fragment.type_condition.name.value)
+                cost = self.selections(fragment_type, fragment.selection_set, page_size, visited | {name})
+            per_parent += cost[0]
+            batched += cost[1]
+            depth = max(depth, cost[2])
+        return per_parent, batched, depth
+
+    def field(self, parent_type, node, page_size, visited):
+        name = node.name.value
+        if name.startswith("__"):
+            return 0, 0, 0
+        field_def = parent_type.fields.get(name)
+        if field_def is None:
+            return 0, 0, 1
+        weight = field_weight(parent_type.name, name)
+        # Root fields run once; nested backend fields are one loader batch
+        own, batched = (weight, 0) if parent_type.name in ROOT_TYPES else (0, weight)
+        field_type = get_nullable_type(field_def.type)
+        named_type = get_named_type(field_type)
+        if not is_composite_type(named_type) or node.selection_set is None:
+            return own, batched, 1
+
+        first = self.argument(node, "first") if "first" in field_def.args else None
+        rows = 1
+        if isinstance(field_type, GraphQLList):
+            if page_size is not None:
+                rows = page_size
+            elif "first" in field_def.args:
+                rows = clamp_page_size(first)
+            else:
+                rows = LIST_SIZE
+        paged = "first" in field_def.args and not isinstance(field_type, GraphQLList)
+        child_page_size = clamp_page_size(first) if paged else None
+        child_per_parent, child_batched, child_depth = self.selections(named_type, node.selection_set, child_page_size, visited)
+        return own + rows * (OBJECT_COST + child_per_parent), batched + child_batched, child_depth + 1
+
+    def argument(self, node, name):
+        for argument in node.arguments:
+            if argument.name.value == name:
+                return value_from_ast_untyped(argument.value, self.variables)
+        return None
+
+    def included(self, node):
+        for directive in node.directives or ():
+            condition = next((a.value for a in directive.arguments if a.name.value == "if"), None)
+            if condition is None:
+                continue
+            value = value_from_ast_untyped(condition, self.variables)
+            if directive.name.value == "skip" and value is True:
+                return False
+            if directive.name.value == "include" and value is False:
+                return False
+        return True
+
+
+def operation_cost(schema, document, variables=None, operation_name=None):
+    """
+    (cost, depth) of the operation that would run, or None if there is none
+    or the schema has no root type for it.
+    """
+    analysis = CostAnalysis(schema, document, variables)
+    for definition in document.definitions:
+        if not isinstance(definition, OperationDefinitionNode):
+            continue
+        name = definition.name.value if definition.name else None
+        if operation_name and name != operation_name:
+            continue
+        return analysis.operation(definition)
+    return None
+
+
+## CLIENT BUDGETS ##
+class TokenBucket:
+    """
+    Holds up to `capacity` points, refilled continuously at `rate` points a
+    second. Only used from the event loop thread, so it takes no lock.
+    """
+    def __init__(self, capacity, rate):
+        self.capacity, self.rate = capacity, rate
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def take(self, amount):
+        """
+        Spends amount, possibly going negative, and returns the seconds until
+        the balance is back to zero (0 if it never went below).
+        """
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= amount
+        return max(0.0, -self.tokens / self.rate)
+
+    def refund(self, amount):
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+
+_buckets = LRUCache(10000)
+
+
+def client_id(context):
+    request = context.get("request") if isinstance(context, dict) else getattr(context, "request", None)
+    if request is None:
+        return "local"
+    client = request.headers.get(CLIENT_HEADER)
+    if client:
+        return client[:64]
+    return request.client.host if request.client else "unknown"
+
+
+def client_bucket(client):
+    bucket = _buckets.get(client)
+    if bucket is None:
+        bucket = TokenBucket(CLIENT_BUDGET, CLIENT_BUDGET / 60)
+        _buckets.put(client, bucket)
+    return bucket
+
+
+def _rejected(message, code, **extensions):
+    COST_REJECTIONS.inc(code)
+    return GraphQLExecutionResult(data=None, errors=[GraphQLError(message, extensions={"code": code, **extensions})])
+
+
+class QueryCost(SchemaExtension):
+    """
+    Prices each operation before it executes and rejects or throttles it;
+    see the top of this module.
+    """
+    report = None
+
+    async def on_execute(self):
+        context = self.execution_context
+        measured = operation_cost(context.schema._schema, context.graphql_document,
+                                  context.variables, context.operation_name)
+        if measured is None:
+            yield
+            return
+        cost, depth = measured
+        OPERATION_COST.observe(cost)
+        self.report = {"requested": cost, "maximum": MAX_COST, "depth": depth, "maxDepth": MAX_DEPTH}
+
+        if depth > MAX_DEPTH:
+            context.result = _rejected(f"Query depth {depth} exceeds the limit of {MAX_DEPTH}", "QUERY_TOO_DEEP")
+        elif cost > MAX_COST:
+            context.result = _rejected(f"Query cost {cost} exceeds the limit of {MAX_COST}", "QUERY_TOO_EXPENSIVE")
+        elif CLIENT_BUDGET > 0:
+            bucket = client_bucket(client_id(context.context))
+            wait = bucket.take(cost)
+            if wait > THROTTLE_MAX_WAIT:
+                bucket.refund(cost)
+                context.result = _rejected("Query cost budget exhausted, retry later", "COST_BUDGET_EXCEEDED",
+                                           retryAfter=round(wait, 1))
+            elif wait > 0:
+                self.report["throttledMs"] = round(wait * 1000)
+                await asyncio.sleep(wait)
+            self.report["budget"] = {"capacity": CLIENT_BUDGET, "remaining": max(0, int(bucket.tokens))}
+        yield
+
+    def get_results(self):
+        return {"cost": self.report} if self.report is not None else {}
@@ -0,0 +1,265 @@
+import asyncio
+import hashlib
+import json
+import os
+from collections import OrderedDict
+from dotenv import load_dotenv
+from graphql import GraphQLError, OperationType as GraphQLOperationType, get_operation_ast, parse
+from strawberry import UNSET
+from strawberry.extensions import SchemaExtension
+from strawberry.fastapi import GraphQLRouter
+from strawberry.http import GraphQLRequestData
+from strawberry.http.exceptions import HTTPException
+from strawberry.types import ExecutionResult
+from strawberry.types.graphql import OperationType
+from src.attendance import redis_connect
+from src.db_executor import run_blocking
+from src.graphql_schema.loaders import Loaders
+from src.metrics import CACHE_REQUESTS
+
+load_dotenv()
+
+# The front end sends the same few query strings over and over. Parsed
+# documents and their validation results are kept in bounded LRU caches keyed
+# by the query text, and clients may send just a sha256 hash of the query
+# (Apollo's automatic persisted queries): the text is looked up here, or in
+# Redis when another worker registered it, and a miss answers
+# PERSISTED_QUERY_NOT_FOUND so the client resends hash + query once.
+DOCUMENT_CACHE_SIZE = int(os.getenv("GRAPHQL_DOCUMENT_CACHE_SIZE", "256"))
+PERSISTED_QUERY_TTL = int(os.getenv("PERSISTED_QUERY_TTL", "604800"))
+GRAPHQL_BATCH_MAX = int(os.getenv("GRAPHQL_BATCH_MAX", "20"))
+
+
+class LRUCache:
+    """
+    Bounded mapping that drops the least recently used entry when full. Only
+    used from the event loop thread, so it takes no lock.
+    """
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._items = OrderedDict()
+
+    def get(self, key):
+        value = self._items.get(key)
+        if value is not None:
+            self._items.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        self._items[key] = value
+        self._items.move_to_end(key)
+        if len(self._items) > self.maxsize:
+            self._items.popitem(last=False)
+
+    def clear(self):
+        self._items.clear()
+
+
+_documents = LRUCache(DOCUMENT_CACHE_SIZE)
+_validation = LRUCache(DOCUMENT_CACHE_SIZE)
+_persisted = LRUCache(DOCUMENT_CACHE_SIZE)
+
+
+class DocumentCache(SchemaExtension):
+    """
+    Skips parsing and validation for query strings seen before. Validation
+    only depends on the query text and the (fixed) schema, so its errors,
+    usually none, are cached alongside.
+    """
+    def on_parse(self):
+        context = self.execution_context
+        document = _documents.get(context.query)
+        CACHE_REQUESTS.inc("graphql_parse", "miss" if document is None else "hit")
+        if document is not None:
+            context.graphql_document = document
+        yield
+        if document is None and context.graphql_document is not None:
+            _documents.put(context.query, context.graphql_document)
+
+    def on_validate(self):
+        context = self.execution_context
+        errors = _validation.get(context.query)
+        CACHE_REQUESTS.inc("graphql_validation", "miss" if errors is None else "hit")
+        if errors is not None:
+            # A non-None list tells Strawberry validation already ran
+            context.errors = list(errors)
+        yield
+        if errors is None and context.errors is not None:
+            _validation.put(context.query, list(context.errors))
+
+
+## PERSISTED QUERIES ##
+class PersistedQueryError(Exception):
+    def __init__(self, message, code):
+        super().__init__(message)
+        self.code = code
+
+
+def _persisted_key(sha):
+    return f"apq:{sha}"
+
+def _load_persisted(sha):
+    try:
+        return redis_connect().get(_persisted_key(sha))
+    except Exception as e:
+        print(f"Persisted query lookup failed for {sha}: {e}")
+        return None
+
+def _store_persisted(sha, query):
+    try:
+        redis_connect().set(_persisted_key(sha), query, ex=PERSISTED_QUERY_TTL)
+    except Exception as e:
+        print(f"Persisted query store failed for {sha}: {e}")
+
+async def resolve_query(data: dict):
+    """
+    The query text for a request body, resolving or registering its
+    extensions.persistedQuery hash. Raises PersistedQueryError.
+    """
+    extensions = data.get("extensions")
+    if isinstance(extensions, str):
+        extensions = json.loads(extensions)
+    persisted = (extensions or {}).get("persistedQuery")
+    query = data.get("query")
+    if not persisted:
+        return query
+    if persisted.get("version") != 1:
+        raise PersistedQueryError("Unsupported persisted query version", "PERSISTED_QUERY_NOT_SUPPORTED")
+    sha = persisted.get("sha256Hash")
+
+    if query is None:
+        query = _persisted.get(sha)
+        CACHE_REQUESTS.inc("persisted_queries", "miss" if query is None else "hit")
+        if query is None:
+            query = await run_blocking(_load_persisted, sha)
+            if query is None:
+                raise PersistedQueryError("PersistedQueryNotFound", "PERSISTED_QUERY_NOT_FOUND")
+            _persisted.put(sha, query)
+        return query
+
+    if hashlib.sha256(query.encode()).hexdigest() != sha:
+        raise PersistedQueryError("provided sha does not match query", "PERSISTED_QUERY_HASH_MISMATCH")
+    if _persisted.get(sha) is None:
+        await run_blocking(_store_persisted, sha, query)
+        _persisted.put(sha, query)
+    return query
+
+
+def _is_mutation(query, operation_name):
+    """
+    Whether the operation a batch item would run is a mutation. Documents
+    that do not parse count as queries; executing them reports the error.
+    """
+    if not query or "mutation" not in query:
+        return False
+    document = _documents.get(query)
+    if document is None:
+        try:
+            document = parse(query)
+        except GraphQLError:
+            return False
+        _documents.put(query, document)
+    operation = get_operation_ast(document, operation_name)
+    return operation is not None and operation.operation == GraphQLOperationType.MUTATION
+
+
+def _error_result(message, code=None) -> ExecutionResult:
+    return ExecutionResult(data=None, errors=[GraphQLError(message, extensions={"code": code} if code else None)])
+
+
+class PersistedQueryRouter(GraphQLRouter):
+    """
+    GraphQLRouter that understands persisted query hashes in JSON POST
+    bodies and GET parameters, and batches: a JSON array of operations in one
+    POST is answered with an array of results.
+    """
+    async def run(self, request, context=UNSET, root_value=UNSET):
+        if request.method == "POST" and "application/json" in request.headers.get("content-type", ""):
+            body = await request.body()
+            if body.lstrip()[:1] == b"[":
+                return await self.run_batch(request, self.parse_json(body), context, root_value)
+        return await super().run(request, context=context, root_value=root_value)
+
+    async def run_batch(self, request, operations, context, root_value):
+        """
+        Runs the queries concurrently with one shared context, so their
+        DataLoaders (and the IN queries behind them) are shared too.
+        Mutations run one at a time in the order they were sent, each with
+        fresh loaders so none reads rows cached before an earlier write.
+        Results keep the order of the operations.
+        """
+        if not operations or len(operations) > GRAPHQL_BATCH_MAX:
+            raise HTTPException(400, f"A batch must hold 1 to {GRAPHQL_BATCH_MAX} operations")
+        sub_response = await self.get_sub_response(request)
+        if context is UNSET:
+            context = await self.get_context(request, response=sub_response)
+        if root_value is UNSET:
+            root_value = await self.get_root_value(request)
+
+        resolved = await asyncio.gather(*[self._resolve_batched(data) for data in operations])
+        results = [error for _, error in resolved]
+        queries, mutations = [], []
+        for index, (data, (query, error)) in enumerate(zip(operations, resolved)):
+            if error is None:
+                (mutations if _is_mutation(query, data.get("operationName")) else queries).append(index)
+
+        async def run_query(index):
+            results[index] = await self._execute_batched(operations[index], resolved[index][0], context, root_value)
+
+        async def run_mutations():
+            for index in mutations:
+                results[index] = await self._execute_batched(operations[index], resolved[index][0],
+                                                             dict(context, loaders=Loaders()), root_value)
+
+        await asyncio.gather(run_mutations(), *[run_query(index) for index in queries])
+        response_data = [await self.process_result(request=request, result=result) for result in results]
+        return self.create_response(response_data=response_data, sub_response=sub_response)
+
+    async def _resolve_batched(self, data):
+        """
+        (query, None) for one batched operation, or (None, the error result
+        that answers it instead).
+        """
+        if not isinstance(data, dict):
+            return None, _error_result("Each batched operation must be a JSON object")
+        try:
+            query = await resolve_query(data)
+        except PersistedQueryError as e:
+            return None, _error_result(str(e), e.code)
+        if not query:
+            return None, _error_result("No GraphQL query found in the request")
+        return query, None
+
+    async def _execute_batched(self, data, query, context, root_value) -> ExecutionResult:
+        return await self.schema.execute(
+            query,
+            variable_values=data.get("variables"),
+            context_value=context,
+            root_value=root_value,
+            operation_name=data.get("operationName"),
+            allowed_operation_types=OperationType.from_http("POST"),
+        )
+
+    def should_render_graphql_ide(self, request) -> bool:
+        # A GET with only a persisted query hash is an operation, not a browser visit
+        return "extensions" not in request.query_params and super().should_render_graphql_ide(request)
+
+    async def parse_http_body(self, request) -> GraphQLRequestData:
+        content_type = request.content_type or ""
+        if request.method == "GET":
+            data = self.parse_query_params(request.query_params)
+        elif "application/json" in content_type:
+            data = self.parse_json(await request.get_body())
+        else:
+            return await super().parse_http_body(request)
+        return GraphQLRequestData(
+            query=await resolve_query(data),
+            variables=data.get("variables"),
+            operation_name=data.get("operationName"),
+        )
+
+    async def execute_operation(self, request, context, root_value) -> ExecutionResult:
+        try:
+            return await super().execute_operation(request, context, root_value)
+        except PersistedQueryError as e:
+            return _error_result(str(e), e.code)
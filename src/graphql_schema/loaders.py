@@ -0,0 +1,98 @@
+from typing import Dict, List, Optional
+from strawberry.dataloader import DataLoader
+from src.mysql_connect import sql_connection
+from src.mongo_connect import connect_mongo
+from src.db_executor import run_blocking
+from src.attendance import redis_connect, get_attendance_many
+
+# Batch functions for Strawberry DataLoaders. Each one receives every key
+# requested during the current tick of the event loop and answers them with
+# a single IN (...) / $in query, returning results in key order. The blocking
+# driver calls run on the DB thread pool.
+
+def _placeholders(keys) -> str:
+    return ", ".join(["%s"] * len(keys))
+
+def _select_rows(query: str, keys) -> List[dict]:
+    with sql_connection() as cnx:
+        cursor = cnx.cursor(dictionary=True)
+        cursor.execute(query.format(keys=_placeholders(keys)), tuple(keys))
+        rows = cursor.fetchall()
+        cursor.close()
+    return rows
+
+def _find_event_type_fields(type_ids: List[int]) -> List[dict]:
+    event_type_collection, _ = connect_mongo()
+    return list(event_type_collection.find({"typeId": {"$in": list(type_ids)}}, {"_id": 0, "typeId": 1, "fields": 1}))
+
+async def load_event_type_fields(type_ids: List[int]) -> List[List[dict]]:
+    docs = await run_blocking(_find_event_type_fields, type_ids)
+    by_id = {doc["typeId"]: doc.get("fields", []) for doc in docs}
+    return [by_id.get(type_id, []) for type_id in type_ids]
+
+async def load_people(person_ids: List[int]) -> List[Optional[dict]]:
+    rows = await run_blocking(_select_rows, "SELECT personId, firstName, lastName FROM Person WHERE personId IN ({keys})", person_ids)
+    by_id = {row['personId']: row for row in rows}
+    return [by_id.get(person_id) for person_id in person_ids]
+
+async def load_signups_by_meeting(meeting_ids: List[int]) -> List[List[dict]]:
+    rows = await run_blocking(
+        _select_rows,
+        "SELECT id, signeeId, signedUpById, meetingId FROM MeetingSignUpItem WHERE meetingId IN ({keys})",
+        meeting_ids,
+    )
+    by_meeting: Dict[int, List[dict]] = {meeting_id: [] for meeting_id in meeting_ids}
+    for row in rows:
+        by_meeting[row['meetingId']].append(row)
+    return [by_meeting[meeting_id] for meeting_id in meeting_ids]
+
+async def load_past_attendance(meeting_ids: List[int]) -> List[List[dict]]:
+    rows = await run_blocking(
+        _select_rows,
+        """SELECT msi.meetingId, msi.signeeId, ai.STATUS
+           FROM attendanceItem ai
+           JOIN MeetingSignUpItem msi ON ai.signupId = msi.id
+           WHERE msi.meetingId IN ({keys})""",
+        meeting_ids,
+    )
+    by_meeting: Dict[int, List[dict]] = {meeting_id: [] for meeting_id in meeting_ids}
+    for row in rows:
+        by_meeting[row['meetingId']].append(row)
+    return [by_meeting[meeting_id] for meeting_id in meeting_ids]
+
+def _live_attendance(event_ids: List[int]) -> List[List[int]]:
+    return [sorted(int(student_id) for student_id in members)
+            for members in get_attendance_many(redis_connect(), event_ids)]
+
+async def load_live_attendance(event_ids: List[int]) -> List[List[int]]:
+    return await run_blocking(_live_attendance, event_ids)
+
+def _find_custom_data(meet_ids: List[int]) -> List[dict]:
+    _, custom_data_collection = connect_mongo()
+    return list(custom_data_collection.find({"meetId": {"$in": list(meet_ids)}}, {"_id": 0, "meetId": 1, "typeId": 1, "values": 1}))
+
+async def load_custom_data(meet_ids: List[int]) -> List[Optional[dict]]:
+    docs = await run_blocking(_find_custom_data, meet_ids)
+    by_id = {doc["meetId"]: doc for doc in docs}
+    return [by_id.get(meet_id) for meet_id in meet_ids]
+
+
+class Loaders:
+    """
+    One set of DataLoaders per GraphQL request, so their caches never leak
+    between requests.
+    """
+    def __init__(self):
+        self.event_type_fields = DataLoader(load_fn=load_event_type_fields)
+        self.people = DataLoader(load_fn=load_people)
+        self.signups_by_meeting = DataLoader(load_fn=load_signups_by_meeting)
+        self.past_attendance = DataLoader(load_fn=load_past_attendance)
+        self.live_attendance = DataLoader(load_fn=load_live_attendance)
+        self.custom_data = DataLoader(load_fn=load_custom_data)
+
+
+async def get_context() -> dict:
+    """
+    context_getter for the GraphQL router.
+    """
+    return {"loaders": Loaders()}
@@ -1,11 +1,24 @@
 import strawberry
-from typing import List, Optional
-from src.mysql_connect import connect_sql
+from strawberry.scalars import JSON
+from strawberry.types import Info
+from typing import Callable, Generic, List, Optional, TypeVar
+from src.mysql_connect import sql_connection
+from src.db_executor import offload, run_blocking
+from src.cache import cached, invalidate, EVENTS
+from src.custom_fields import get_validator, register_event_type, validate_values
+from src.pagination import keyset_clause, clamp_page_size
+from src.queries import EVENT_COLUMNS, PAST_ATTENDANCE_SQL, event_select, signups_sql
 from src.attendance import redis_connect, get_attendance as get_attendance_logic
 from src.attendance import checkin as checkin_logic, checkout as checkout_logic
+from src.attendance import checkin_many, checkout_many, open_event, get_absent, roster_add, roster_remove
+from src.jobs import enqueue_finalize, get_job
 from pydantic import BaseModel
 from datetime import date
-from src.event import connect_mongo # Moved to top
+from src.mongo_connect import connect_mongo
+from src.metrics import MetricsExtension
+from src.graphql_schema.documents import DocumentCache
+from src.graphql_schema.cost import QueryCost
+from src.graphql_schema.selection import selected_names
 
 # Pydantic models for business logic
 class CustomFieldDefinition(BaseModel):
@@ -71,15 +84,6 @@ class Meeting:
     meetId: int
     title: str
 
-@strawberry.type
-class Event(Meeting):
-    createdByID: int
-    typeId: int
-    location: str
-    startDate: str
-    endDate: str
-    type: str
-
 @strawberry.type
 class MeetingSignUpItem:
     id: int
@@ -87,6 +91,16 @@ class MeetingSignUpItem:
     signedUpById: int
     meetingId: int
 
+    @strawberry.field
+    async def signee(self, info: Info) -> Optional[Person]:
+        row = await info.context["loaders"].people.load(self.signeeId)
+        return Person(**row) if row else None
+
+    @strawberry.field
+    async def signedUpBy(self, info: Info) -> Optional[Person]:
+        row = await info.context["loaders"].people.load(self.signedUpById)
+        return Person(**row) if row else None
+
 @strawberry.type
 class AttendanceItem:
     id: int
@@ -98,61 +112,180 @@ class PastAttendanceItem:
     signeeId: int
     status: str
 
-def get_students() -> List[Student]:
-    cnx = connect_sql()
-    cursor = cnx.cursor(dictionary=True)
-    query = "SELECT p.personId, p.firstName, p.lastName, s.grade FROM Person p JOIN Student s ON p.personId = s.personId"
-    cursor.execute(query)
-    students = [Student(**row) for row in cursor.fetchall()]
-    cursor.close()
-    cnx.close()
+@strawberry.type
+class EventCustomData:
+    typeId: int
+    values: JSON
+
+# The nested fields below go through the per-request DataLoaders, so a page
+# showing one event or a whole list costs one query per backend and level.
+@strawberry.type
+class Event(Meeting):
+    createdByID: int
+    typeId: int
+    location: str
+    startDate: str
+    endDate: str
+    type: str
+
+    @strawberry.field
+    async def signups(self, info: Info) -> List[MeetingSignUpItem]:
+        rows = await info.context["loaders"].signups_by_meeting.load(self.meetId)
+        return [MeetingSignUpItem(**row) for row in rows]
+
+    @strawberry.field
+    async def liveAttendance(self, info: Info) -> List[int]:
+        return await info.context["loaders"].live_attendance.load(self.meetId)
+
+    @strawberry.field
+    async def pastAttendance(self, info: Info) -> List[PastAttendanceItem]:
+        rows = await info.context["loaders"].past_attendance.load(self.meetId)
+        return [PastAttendanceItem(signeeId=row['signeeId'], status=row['STATUS']) for row in rows]
+
+    @strawberry.field
+    async def customData(self, info: Info) -> Optional[EventCustomData]:
+        doc = await info.context["loaders"].custom_data.load(self.meetId)
+        return EventCustomData(typeId=doc["typeId"], values=doc.get("values", {})) if doc else None
+
+@strawberry.type
+class Job:
+    id: str
+    eventId: int
+    status: str
+    attempts: int
+    present: Optional[int] = None
+    absent: Optional[int] = None
+    error: Optional[str] = None
+
+def make_job(job) -> Job:
+    result = job["result"] or {}
+    return Job(id=job["id"], eventId=job["eventId"], status=job["status"], attempts=job["attempts"],
+               present=result.get("present"), absent=result.get("absent"), error=job.get("error"))
+
+@strawberry.type
+class AttendanceResult:
+    eventId: int
+    studentId: int
+    changed: bool
+    signedUp: bool = True
+
+@strawberry.type
+class PageInfo:
+    endCursor: Optional[int]
+    hasNextPage: bool
+
+T = TypeVar("T")
+
+@strawberry.type
+class Page(Generic[T]):
+    items: List[T]
+    pageInfo: PageInfo
+
+def make_page(items: list, first: int, cursor_of: Callable) -> Page:
+    """
+    Builds a Page from up to first + 1 items; the extra item only signals
+    that another page exists.
+    """
+    page = items[:first]
+    return Page(
+        items=page,
+        pageInfo=PageInfo(
+            endCursor=cursor_of(page[-1]) if page else None,
+            hasNextPage=len(items) > first,
+        ),
+    )
+
+@offload
+def _fetch_students(first: Optional[int], after: Optional[int]) -> List[Student]:
+    with sql_connection() as cnx:
+        cursor = cnx.cursor(dictionary=True)
+        query = "SELECT p.personId, p.firstName, p.lastName, s.grade FROM Person p JOIN Student s ON p.personId = s.personId"
+        page_sql, params = keyset_clause("p.personId", first, after)
+        cursor.execute(query + page_sql, params)
+        students = [Student(**row) for row in cursor.fetchall()]
+        cursor.close()
     return students
 
-def get_volunteers() -> List[Volunteer]:
-    cnx = connect_sql()
-    cursor = cnx.cursor(dictionary=True)
-    query = "SELECT p.personId, p.firstName, p.lastName FROM Person p JOIN Volunteer v ON p.personId = v.personId"
-    cursor.execute(query)
-    volunteers = [Volunteer(**row) for row in cursor.fetchall()]
-    cursor.close()
-    cnx.close()
+async def get_students(first: Optional[int] = None, after: Optional[int] = None) -> List[Student]:
+    return await _fetch_students(clamp_page_size(first), after)
+
+async def get_students_page(first: Optional[int] = None, after: Optional[int] = None) -> Page[Student]:
+    first = clamp_page_size(first)
+    return make_page(await _fetch_students(first + 1, after), first, lambda p: p.personId)
+
+@offload
+def _fetch_volunteers(first: Optional[int], after: Optional[int]) -> List[Volunteer]:
+    with sql_connection() as cnx:
+        cursor = cnx.cursor(dictionary=True)
+        query = "SELECT p.personId, p.firstName, p.lastName FROM Person p JOIN Volunteer v ON p.personId = v.personId"
+        page_sql, params = keyset_clause("p.personId", first, after)
+        cursor.execute(query + page_sql, params)
+        volunteers = [Volunteer(**row) for row in cursor.fetchall()]
+        cursor.close()
     return volunteers
 
-def get_admins() -> List[Admin]:
-    cnx = connect_sql()
-    cursor = cnx.cursor(dictionary=True)
-    query = "SELECT p.personId, p.firstName, p.lastName FROM Person p JOIN Admin a ON p.personId = a.personId"
-    cursor.execute(query)
-    admins = [Admin(**row) for row in cursor.fetchall()]
-    cursor.close()
-    cnx.close()
+async def get_volunteers(first: Optional[int] = None, after: Optional[int] = None) -> List[Volunteer]:
+    return await _fetch_volunteers(clamp_page_size(first), after)
+
+async def get_volunteers_page(first: Optional[int] = None, after: Optional[int] = None) -> Page[Volunteer]:
+    first = clamp_page_size(first)
+    return make_page(await _fetch_volunteers(first + 1, after), first, lambda p: p.personId)
+
+@offload
+def _fetch_admins(first: Optional[int], after: Optional[int]) -> List[Admin]:
+    with sql_connection() as cnx:
+        cursor = cnx.cursor(dictionary=True)
+        query = "SELECT p.personId, p.firstName, p.lastName FROM Person p JOIN Admin a ON p.personId = a.personId"
+        page_sql, params = keyset_clause("p.personId", first, after)
+        cursor.execute(query + page_sql, params)
+        admins = [Admin(**row) for row in cursor.fetchall()]
+        cursor.close()
     return admins
 
-def get_guardians() -> List[Guardian]:
-    cnx = connect_sql()
-    cursor = cnx.cursor(dictionary=True)
-    query = "SELECT p.personId, p.firstName, p.lastName FROM Person p JOIN Guardian g ON p.personId = g.personId"
-    cursor.execute(query)
-    guardians = [Guardian(**row) for row in cursor.fetchall()]
-    cursor.close()
-    cnx.close()
+async def get_admins(first: Optional[int] = None, after: Optional[int] = None) -> List[Admin]:
+    return await _fetch_admins(clamp_page_size(first), after)
+
+async def get_admins_page(first: Optional[int] = None, after: Optional[int] = None) -> Page[Admin]:
+    first = clamp_page_size(first)
+    return make_page(await _fetch_admins(first + 1, after), first, lambda p: p.personId)
+
+@offload
+def _fetch_guardians(first: Optional[int], after: Optional[int]) -> List[Guardian]:
+    with sql_connection() as cnx:
+        cursor = cnx.cursor(dictionary=True)
+        query = "SELECT p.personId, p.firstName, p.lastName FROM Person p JOIN Guardian g ON p.personId = g.personId"
+        page_sql, params = keyset_clause("p.personId", first, after)
+        cursor.execute(query + page_sql, params)
+        guardians = [Guardian(**row) for row in cursor.fetchall()]
+        cursor.close()
     return guardians
 
-def get_event_types() -> List[EventType]:
-    cnx = connect_sql()
-    cursor = cnx.cursor(dictionary=True)
-    query = "SELECT typeId, typeName, description FROM eventType"
-    cursor.execute(query)
-    event_types_data = cursor.fetchall()
-    cursor.close()
-    cnx.close()
+async def get_guardians(first: Optional[int] = None, after: Optional[int] = None) -> List[Guardian]:
+    return await _fetch_guardians(clamp_page_size(first), after)
+
+async def get_guardians_page(first: Optional[int] = None, after: Optional[int] = None) -> Page[Guardian]:
+    first = clamp_page_size(first)
+    return make_page(await _fetch_guardians(first + 1, after), first, lambda p: p.personId)
+
+def _fetch_event_type_rows() -> List[dict]:
+    with sql_connection() as cnx:
+        cursor = cnx.cursor(dictionary=True)
+        query = "SELECT typeId, typeName, description FROM eventType"
+        cursor.execute(query)
+        event_types_data = cursor.fetchall()
+        cursor.close()
+    return event_types_data
 
-    event_type_collection, _ = connect_mongo() # Connect to MongoDB
+async def get_event_types(info: Info) -> List[EventType]:
+    event_types_data = await run_blocking(_fetch_event_type_rows)
+
+    # One $in query for every type's custom fields instead of a find_one per row
+    all_fields = await info.context["loaders"].event_type_fields.load_many(
+        [row['typeId'] for row in event_types_data]
+    )
 
     event_types = []
-    for row in event_types_data:
-        mongo_doc = event_type_collection.find_one({"typeId": row['typeId']})
-        fields_data = mongo_doc.get("fields", []) if mongo_doc else []
+    for row, fields_data in zip(event_types_data, all_fields):
         event_types.append(EventType(
             typeId=row['typeId'],
             typeName=row['typeName'],
@@ -161,39 +294,62 @@ def get_event_types() -> List[EventType]:
         ))
     return event_types
 
-def get_events() -> List[Event]:
-    cnx = connect_sql()
-    cursor = cnx.cursor(dictionary=True)
-    query = """
-        SELECT m.meetId, m.title, e.createdByID, e.typeId, e.location, e.startDate, e.endDate, et.typeName AS type
-        FROM Meeting m
-        JOIN Event e ON m.meetId = e.meetId
-        JOIN eventType et ON e.typeId = et.typeId
+def event_shape(info: Info, *path: str) -> tuple:
+    """
+    The EVENT_COLUMNS fields needed for the current selection, in a fixed order.
     """
-    cursor.execute(query)
-    events = [Event(
-        meetId=row['meetId'],
-        title=row['title'],
-        createdByID=row['createdByID'],
-        typeId=row['typeId'],
-        location=row['location'],
-        startDate=str(row['startDate']),
-        endDate=str(row['endDate']),
-        type=row['type']
-    ) for row in cursor.fetchall()]
-    cursor.close()
-    cnx.close()
-    return events
-
-def get_signups(meeting_id: int) -> List[MeetingSignUpItem]:
-    cnx = connect_sql()
-    cursor = cnx.cursor(dictionary=True)
-    query = "SELECT id, signeeId, signedUpById, meetingId FROM MeetingSignUpItem WHERE meetingId = %s"
-    cursor.execute(query, (meeting_id,))
-    signups = [MeetingSignUpItem(**row) for row in cursor.fetchall()]
-    cursor.close()
-    cnx.close()
-    return signups
+    names = selected_names(info, *path) | {"meetId"}
+    return tuple(field for field in EVENT_COLUMNS if field in names)
+
+def make_event(row: dict) -> Event:
+    # Fields that were not selected stay None; Strawberry never resolves them
+    return Event(**{field: row.get(field) for field in EVENT_COLUMNS})
+
+def _event_row(row: dict) -> dict:
+    for field in ("startDate", "endDate"):
+        if field in row:
+            row[field] = str(row[field])
+    return row
+
+def _load_events(shape: tuple, first: Optional[int], after: Optional[int]) -> List[Event]:
+    def load():
+        with sql_connection() as cnx:
+            cursor = cnx.cursor(dictionary=True)
+            page_sql, params = keyset_clause("e.meetId", first, after)
+            cursor.execute(event_select(shape) + page_sql, params)
+            rows = cursor.fetchall()
+            cursor.close()
+        return [_event_row(row) for row in rows]
+
+    return [make_event(row) for row in cached(EVENTS, f"all:{','.join(shape)}:{first}:{after}", load)]
+
+@offload
+def get_events(info: Info, first: Optional[int] = None, after: Optional[int] = None) -> List[Event]:
+    return _load_events(event_shape(info), clamp_page_size(first), after)
+
+async def get_events_page(info: Info, first: Optional[int] = None, after: Optional[int] = None) -> Page[Event]:
+    first = clamp_page_size(first)
+    items = await run_blocking(_load_events, event_shape(info, "items"), first + 1, after)
+    return make_page(items, first, lambda e: e.meetId)
+
+def _fetch_signups(meeting_id: int, first: Optional[int], after: Optional[int]) -> List[dict]:
+    with sql_connection() as cnx:
+        cursor = cnx.cursor(dictionary=True)
+        cursor.execute(*signups_sql(meeting_id, first, after))
+        rows = cursor.fetchall()
+        cursor.close()
+    return rows
+
+async def _load_signups(meeting_id: int, first: int, after: Optional[int]) -> List[MeetingSignUpItem]:
+    rows = await run_blocking(_fetch_signups, meeting_id, first, after)
+    return [MeetingSignUpItem(**row) for row in rows]
+
+async def get_signups(meeting_id: int, first: Optional[int] = None, after: Optional[int] = None) -> List[MeetingSignUpItem]:
+    return await _load_signups(meeting_id, clamp_page_size(first), after)
+
+async def get_signups_page(meeting_id: int, first: Optional[int] = None, after: Optional[int] = None) -> Page[MeetingSignUpItem]:
+    first = clamp_page_size(first)
+    return make_page(await _load_signups(meeting_id, first + 1, after), first, lambda s: s.id)
 
 @strawberry.input
 class CustomFieldDefinitionInput:
@@ -222,23 +378,30 @@ class CreateEventInput:
     endDate: str
     customValues: List[CustomValueInput]
 
+@strawberry.input
+class AttendanceInput:
+    eventId: int
+    studentId: int
+
 @strawberry.type
 class Mutation:
     @strawberry.mutation
+    @offload
     def deleteEvent(self, meet_id: int) -> bool:
         try:
-            cnx = connect_sql()
-            cursor = cnx.cursor()
-            query = "DELETE FROM Meeting WHERE meetId = %s"
-            cursor.execute(query, (meet_id,))
-            cnx.commit()
-            cursor.close()
-            cnx.close()
+            with sql_connection() as cnx:
+                cursor = cnx.cursor()
+                query = "DELETE FROM Meeting WHERE meetId = %s"
+                cursor.execute(query, (meet_id,))
+                cnx.commit()
+                cursor.close()
+            invalidate(EVENTS)
             return True
         except Exception as e:
             raise Exception(f"Error deleting event: {e}")
 
     @strawberry.mutation
+    @offload
     def create_event_type(self, event_type_data: CreateEventTypeInput) -> EventType:
         request = CustomFieldRequest(
             name=event_type_data.name,
@@ -247,18 +410,18 @@ class Mutation:
         )
         try:
 
-            cnx = connect_sql()
             event_type_collection, _ = connect_mongo()
 
-            with cnx.cursor() as cur:
-                cur.execute(
-                    "INSERT INTO eventType (typeName, description) VALUES (%s, %s)",
-                    (request.name, request.description),
-                )
-                cnx.commit()
-                type_id = cur.lastrowid
+            with sql_connection() as cnx:
+                with cnx.cursor() as cur:
+                    cur.execute(
+                        "INSERT INTO eventType (typeName, description) VALUES (%s, %s)",
+                        (request.name, request.description),
+                    )
+                    cnx.commit()
+                    type_id = cur.lastrowid
             
-            if event_type_collection.find_one({"typeId": type_id}):
+            if event_type_collection.find_one({"typeId": type_id}, {"_id": 1}):
                 raise Exception(f"Generated typeId {type_id} from MySQL already exists in MongoDB. "
                                 "Please resolve data inconsistency or clear MongoDB eventTypes collection if appropriate.")
 
@@ -266,20 +429,22 @@ class Mutation:
                 "typeId": type_id,
                 "name": request.name,
                 "description": request.description,
-                "fields": request.fields
+                "fields": [f.dict() for f in request.fields]
             }
             event_type_collection.insert_one(doc)
+            register_event_type(type_id, doc["fields"])
             
             return EventType(
                 typeId=type_id,
                 typeName=request.name,
                 description=request.description or "",
-                fields=[CustomFieldDefinitionGQL(**f) for f in request.fields]
+                fields=[CustomFieldDefinitionGQL(**f) for f in doc["fields"]]
             )
         except Exception as e:
             raise Exception(f"Error creating event type: {e}")
 
     @strawberry.mutation
+    @offload
     def create_event(self, event_data: CreateEventInput) -> Event:
         # Determine the effective title early
         title_from_input = str(event_data.title) if event_data.title is not None else None
@@ -301,18 +466,18 @@ class Mutation:
 
             event_type_collection, custom_event_collection = connect_mongo()
 
-            schema_doc = event_type_collection.find_one({"typeId": request.typeId})
-            if not schema_doc:
+            # Cached per typeId, so the eventTypes lookup only happens on a miss
+            validator = get_validator(request.typeId)
+            if validator is None:
                 # If not found in MongoDB, check MySQL and create in MongoDB if exists in MySQL
-                cnx_mysql = connect_sql()
-                cursor_mysql = cnx_mysql.cursor(dictionary=True)
-                cursor_mysql.execute(
-                    "SELECT typeName, description FROM eventType WHERE typeId = %s",
-                    (request.typeId,)
-                )
-                mysql_event_type = cursor_mysql.fetchone()
-                cursor_mysql.close()
-                cnx_mysql.close()
+                with sql_connection() as cnx_mysql:
+                    cursor_mysql = cnx_mysql.cursor(dictionary=True)
+                    cursor_mysql.execute(
+                        "SELECT typeName, description FROM eventType WHERE typeId = %s",
+                        (request.typeId,)
+                    )
+                    mysql_event_type = cursor_mysql.fetchone()
+                    cursor_mysql.close()
 
                 if mysql_event_type:
                     # Create the MongoDB document for the missing eventType
@@ -323,64 +488,59 @@ class Mutation:
                         "fields": [] # No custom fields by default if created this way
                     }
                     event_type_collection.insert_one(doc)
-                    schema_doc = doc # Use the newly created doc for validation below
+                    validator = register_event_type(request.typeId, doc["fields"]) # Validate against the newly created doc below
                 else:
                     raise Exception("Unknown event typeId") # Not in MySQL either, so it's truly unknown
 
-            allowed_fields = {f["name"] for f in schema_doc.get("fields", [])}
-            for cv in request.customValues:
-                if cv.fieldName not in allowed_fields:
-                    raise Exception(f"Unknown custom field for this event type: {cv.fieldName}")
-
-            cnx = connect_sql()
-            with cnx.cursor() as cur:
-                # Check if Meeting exists, if not, create it
-                cur.execute("SELECT meetId FROM Meeting WHERE meetId = %s", (request.meetId,))
-                existing_meeting = cur.fetchone()
-                if not existing_meeting:
+            values_dict = validate_values(validator, {cv.fieldName: cv.value for cv in request.customValues})
+
+            with sql_connection() as cnx:
+                with cnx.cursor() as cur:
+                    # Check if Meeting exists, if not, create it
+                    cur.execute("SELECT meetId FROM Meeting WHERE meetId = %s", (request.meetId,))
+                    existing_meeting = cur.fetchone()
+                    if not existing_meeting:
+                        cur.execute(
+                            "INSERT INTO Meeting (meetId, title) VALUES (%s, %s)",
+                            (request.meetId, effective_title),
+                        )
+
                     cur.execute(
-                        "INSERT INTO Meeting (meetId, title) VALUES (%s, %s)",
-                        (request.meetId, effective_title),
+                        """
+                        INSERT INTO Event (meetId, createdByID, typeId, location, startDate, endDate)
+                        VALUES (%s, %s, %s, %s, %s, %s)
+                        """,
+                        (
+                            request.meetId,
+                            request.createdByID,
+                            request.typeId,
+                            request.location,
+                            request.startDate,
+                            request.endDate,
+                        ),
                     )
-
-                cur.execute(
-                    """
-                    INSERT INTO Event (meetId, createdByID, typeId, location, startDate, endDate)
-                    VALUES (%s, %s, %s, %s, %s, %s)
-                    """,
-                    (
-                        request.meetId,
-                        request.createdByID,
-                        request.typeId,
-                        request.location,
-                        request.startDate,
-                        request.endDate,
-                    ),
-                )
-            cnx.commit()
-
-            values_dict = {cv.fieldName: cv.value for cv in request.customValues}
-            mongo_doc = {
-                "eventId": request.meetId,
-                "meetId": request.meetId,
-                "createdByID": request.createdByID,
-                "typeId": request.typeId,
-                "values": values_dict
-            }
-            custom_event_collection.insert_one(mongo_doc)
-            
-            # The title for the returned Event object is still fetched from the DB
-            # with cnx.cursor(dictionary=True) as cur:
-            #    cur.execute("SELECT title FROM Meeting WHERE meetId = %s", (request.meetId,))
-            #    meeting = cur.fetchone()
-            #    title = meeting['title'] if meeting else "" # This will now always exist or be the newly created one
-
-            with cnx.cursor(dictionary=True) as cur:
-                cur.execute("SELECT typeName FROM eventType WHERE typeId = %s", (request.typeId,))
-                event_type_name_data = cur.fetchone()
-                event_type_name = event_type_name_data['typeName'] if event_type_name_data else "Unknown Type"
+                cnx.commit()
+                invalidate(EVENTS)
+
+                mongo_doc = {
+                    "eventId": request.meetId,
+                    "meetId": request.meetId,
+                    "createdByID": request.createdByID,
+                    "typeId": request.typeId,
+                    "values": values_dict
+                }
+                custom_event_collection.insert_one(mongo_doc)
             
-            cnx.close()
+                # The title for the returned Event object is still fetched from the DB
+                # with cnx.cursor(dictionary=True) as cur:
+                #    cur.execute("SELECT title FROM Meeting WHERE meetId = %s", (request.meetId,))
+                #    meeting = cur.fetchone()
+                #    title = meeting['title'] if meeting else "" # This will now always exist or be the newly created one
+
+                with cnx.cursor(dictionary=True) as cur:
+                    cur.execute("SELECT typeName FROM eventType WHERE typeId = %s", (request.typeId,))
+                    event_type_name_data = cur.fetchone()
+                    event_type_name = event_type_name_data['typeName'] if event_type_name_data else "Unknown Type"
 
             return Event(
                 meetId=request.meetId,
@@ -396,6 +556,7 @@ class Mutation:
             raise Exception(f"Error creating event: {e}")
 
     @strawberry.mutation
+    @offload
     def checkin(self, event_id: int, student_id: int) -> bool:
         try:
             r = redis_connect()
@@ -405,6 +566,7 @@ class Mutation:
             raise Exception(f"Error checking in: {e}")
 
     @strawberry.mutation
+    @offload
     def checkout(self, event_id: int, student_id: int) -> bool:
         try:
             r = redis_connect()
@@ -414,30 +576,70 @@ class Mutation:
             raise Exception(f"Error checking out: {e}")
 
     @strawberry.mutation
+    @offload
+    def checkin_batch(self, items: List[AttendanceInput]) -> List[AttendanceResult]:
+        try:
+            changed = checkin_many(redis_connect(), [(i.eventId, i.studentId) for i in items])
+            return [AttendanceResult(eventId=i.eventId, studentId=i.studentId, changed=bool(c), signedUp=c is not None)
+                    for i, c in zip(items, changed)]
+        except Exception as e:
+            raise Exception(f"Error checking in: {e}")
+
+    @strawberry.mutation
+    @offload
+    def checkout_batch(self, items: List[AttendanceInput]) -> List[AttendanceResult]:
+        try:
+            changed = checkout_many(redis_connect(), [(i.eventId, i.studentId) for i in items])
+            return [AttendanceResult(eventId=i.eventId, studentId=i.studentId, changed=c) for i, c in zip(items, changed)]
+        except Exception as e:
+            raise Exception(f"Error checking out: {e}")
+
+    @strawberry.mutation
+    @offload
+    def open_event(self, event_id: int) -> int:
+        try:
+            return open_event(redis_connect(), event_id)
+        except Exception as e:
+            raise Exception(f"Error opening event: {e}")
+
+    @strawberry.mutation
+    @offload
+    def end_event(self, event_id: int) -> Job:
+        try:
+            return make_job(enqueue_finalize(redis_connect(), event_id))
+        except Exception as e:
+            raise Exception(f"Error ending event: {e}")
+
+    @strawberry.mutation
+    @offload
     def signUpForEvent(self, meeting_id: int, signee_id: int, signed_up_by_id: int) -> MeetingSignUpItem:
         try:
-            cnx = connect_sql()
-            cursor = cnx.cursor(dictionary=True)
-            query = "INSERT INTO MeetingSignUpItem (meetingId, signeeId, signedUpById) VALUES (%s, %s, %s)"
-            cursor.execute(query, (meeting_id, signee_id, signed_up_by_id))
-            new_id = cursor.lastrowid
-            cnx.commit()
-            cursor.close()
-            cnx.close()
+            with sql_connection() as cnx:
+                cursor = cnx.cursor(dictionary=True)
+                query = "INSERT INTO MeetingSignUpItem (meetingId, signeeId, signedUpById) VALUES (%s, %s, %s)"
+                cursor.execute(query, (meeting_id, signee_id, signed_up_by_id))
+                new_id = cursor.lastrowid
+                cnx.commit()
+                cursor.close()
+            roster_add(redis_connect(), meeting_id, signee_id)
             return MeetingSignUpItem(id=new_id, meetingId=meeting_id, signeeId=signee_id, signedUpById=signed_up_by_id)
         except Exception as e:
             raise Exception(f"Error signing up for event: {e}")
 
     @strawberry.mutation
+    @offload
     def removeSignUp(self, signup_id: int) -> bool:
         try:
-            cnx = connect_sql()
-            cursor = cnx.cursor()
-            query = "DELETE FROM MeetingSignUpItem WHERE id = %s"
-            cursor.execute(query, (signup_id,))
-            cnx.commit()
-            cursor.close()
-            cnx.close()
+            with sql_connection() as cnx:
+                cursor = cnx.cursor()
+                cursor.execute("SELECT meetingId, signeeId FROM MeetingSignUpItem WHERE id = %s", (signup_id,))
+                signup = cursor.fetchone()
+                query = "DELETE FROM MeetingSignUpItem WHERE id = %s"
+                cursor.execute(query, (signup_id,))
+                cnx.commit()
+                cursor.close()
+            if signup:
+                roster_remove(redis_connect(), *signup)
             return True
         except Exception as e:
             raise Exception(f"Error removing sign up: {e}")
@@ -452,36 +654,32 @@ class Query:
     events: List[Event] = strawberry.field(resolver=get_events)
     signups: List[MeetingSignUpItem] = strawberry.field(resolver=get_signups)
 
+    # Keyset-paginated variants: pass pageInfo.endCursor back as `after`
+    students_page: Page[Student] = strawberry.field(resolver=get_students_page)
+    volunteers_page: Page[Volunteer] = strawberry.field(resolver=get_volunteers_page)
+    admins_page: Page[Admin] = strawberry.field(resolver=get_admins_page)
+    guardians_page: Page[Guardian] = strawberry.field(resolver=get_guardians_page)
+    events_page: Page[Event] = strawberry.field(resolver=get_events_page)
+    signups_page: Page[MeetingSignUpItem] = strawberry.field(resolver=get_signups_page)
+
     @strawberry.field
-    def event(self, info, meetId: int) -> Optional[Event]:
-        cnx = connect_sql()
-        cursor = cnx.cursor(dictionary=True)
-        query = """
-            SELECT m.meetId, m.title, e.createdByID, e.typeId, e.location, e.startDate, e.endDate, et.typeName AS type
-            FROM Meeting m
-            JOIN Event e ON m.meetId = e.meetId
-            JOIN eventType et ON e.typeId = et.typeId
-            WHERE m.meetId = %s
-        """
-        cursor.execute(query, (meetId,))
-        event_data = cursor.fetchone()
-        cursor.close()
-        cnx.close()
+    @offload
+    def event(self, info: Info, meetId: int) -> Optional[Event]:
+        shape = event_shape(info)
 
-        if event_data:
-            return Event(
-                meetId=event_data["meetId"],
-                title=event_data["title"],
-                createdByID=event_data["createdByID"],
-                typeId=event_data["typeId"],
-                location=event_data["location"],
-                startDate=str(event_data["startDate"]),
-                endDate=str(event_data["endDate"]),
-                type=event_data["type"]
-            )
-        return None
+        def load():
+            with sql_connection() as cnx:
+                cursor = cnx.cursor(dictionary=True)
+                cursor.execute(event_select(shape) + " WHERE e.meetId = %s", (meetId,))
+                row = cursor.fetchone()
+                cursor.close()
+            return _event_row(row) if row else None
+
+        event_data = cached(EVENTS, f"meet:{meetId}:{','.join(shape)}", load)
+        return make_event(event_data) if event_data else None
 
     @strawberry.field
+    @offload
     def attendance(self, event_id: int) -> List[int]:
         try:
             r = redis_connect()
@@ -490,22 +688,33 @@ class Query:
             raise Exception(f"Error getting attendance: {e}")
 
     @strawberry.field
+    @offload
+    def job(self, job_id: str) -> Optional[Job]:
+        try:
+            job = get_job(redis_connect(), job_id)
+            return make_job(job) if job else None
+        except Exception as e:
+            raise Exception(f"Error getting job: {e}")
+
+    @strawberry.field
+    @offload
+    def absent(self, event_id: int) -> List[int]:
+        try:
+            return sorted(int(student_id) for student_id in get_absent(redis_connect(), event_id))
+        except Exception as e:
+            raise Exception(f"Error getting absent students: {e}")
+
+    @strawberry.field
+    @offload
     def pastAttendance(self, event_id: int) -> List[PastAttendanceItem]:
         try:
-            cnx = connect_sql()
-            cursor = cnx.cursor(dictionary=True)
-            query = """
-                SELECT msi.signeeId, ai.STATUS
-                FROM attendanceItem ai
-                JOIN MeetingSignUpItem msi ON ai.signupId = msi.id
-                WHERE msi.meetingId = %s
-            """
-            cursor.execute(query, (event_id,))
-            attendance_items = [PastAttendanceItem(signeeId=row['signeeId'], status=row['STATUS']) for row in cursor.fetchall()]
-            cursor.close()
-            cnx.close()
+            with sql_connection() as cnx:
+                cursor = cnx.cursor(dictionary=True)
+                cursor.execute(PAST_ATTENDANCE_SQL, (event_id,))
+                attendance_items = [PastAttendanceItem(signeeId=row['signeeId'], status=row['STATUS']) for row in cursor.fetchall()]
+                cursor.close()
             return attendance_items
         except Exception as e:
             raise Exception(f"Error getting past attendance: {e}")
 
-custom_schema = strawberry.Schema(query=Query, mutation=Mutation)
\ No newline at end of file
+custom_schema = strawberry.Schema(query=Query, mutation=Mutation, extensions=[MetricsExtension, DocumentCache, QueryCost])
\ No newline at end of file
@@ -0,0 +1,23 @@
+from typing import Set
+from strawberry.types import Info
+from strawberry.types.nodes import FragmentSpread, InlineFragment
+
+# Helpers for resolvers that shape their SQL after the fields the client
+# actually asked for.
+
+def _fields(selections):
+    for selection in selections:
+        if isinstance(selection, (InlineFragment, FragmentSpread)):
+            yield from _fields(selection.selections)
+        else:
+            yield selection
+
+def selected_names(info: Info, *path: str) -> Set[str]:
+    """
+    Names of the fields selected under the current field, with fragments
+    flattened. `path` descends further first, e.g. "items" for a Page.
+    """
+    selections = [child for field in info.selected_fields for child in field.selections]
+    for name in path:
+        selections = [child for field in _fields(selections) if field.name == name for child in field.selections]
+    return {field.name for field in _fields(selections)}
@@ -0,0 +1,177 @@
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+from dotenv import load_dotenv
+from src.attendance import redis_connect, end_event
+
+load_dotenv()
+
+# Background jobs kept in Redis. A job is a hash at job:{id}; its id goes on
+# JOB_QUEUE and a worker moves it to its own processing list while it runs it.
+# Ids are deterministic (finalize:{event_id}), so enqueueing the same work
+# while it is pending hands back the existing job instead of starting another.
+#
+# Every worker thread is registered in JOB_WORKER_SET and its process keeps a
+# heartbeat key per worker alive (JOB_LEASE seconds, renewed a few times per
+# lease). Jobs are only taken back from a worker whose heartbeat has expired,
+# i.e. whose process is gone, never from one that is still running them.
+JOB_QUEUE = "jobs:queue"
+JOB_WORKER_SET = "jobs:workers"
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_TTL = int(os.getenv("JOB_TTL", "86400"))
+JOB_LEASE = int(os.getenv("JOB_LEASE", "30"))
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+_workers = []
+_stop = threading.Event()
+
+def _job_key(job_id):
+    return f"job:{job_id}"
+
+def _processing_key(worker):
+    return f"jobs:processing:{worker}"
+
+def _heartbeat_key(worker):
+    return f"jobs:heartbeat:{worker}"
+
+def get_job(r, job_id):
+    """
+    Returns the job as a dict, with its result decoded, or None if unknown.
+    """
+    job = r.hgetall(_job_key(job_id))
+    if not job:
+        return None
+    job["eventId"] = int(job["eventId"])
+    job["attempts"] = int(job.get("attempts", 0))
+    job["result"] = json.loads(job["result"]) if job.get("result") else None
+    return job
+
+def enqueue_finalize(r, event_id):
+    """
+    Queues end_event for an event and returns the job. A job that is queued
+    or running is returned as is; a done or failed one is queued again, so an
+    event that was reopened and ended again is finalized again.
+    """
+    job_id = f"finalize:{event_id}"
+    key = _job_key(job_id)
+
+    def submit(pipe):
+        status = pipe.hget(key, "status")
+        if status in (QUEUED, RUNNING):
+            return
+        pipe.multi()
+        pipe.delete(key)
+        pipe.hset(key, mapping={"id": job_id, "type": "finalize", "eventId": event_id,
+                                "status": QUEUED, "attempts": 0, "createdAt": time.time()})
+        pipe.lpush(JOB_QUEUE, job_id)
+
+    r.transaction(submit, key)
+    return get_job(r, job_id)
+
+def _run(r, job_id):
+    key = _job_key(job_id)
+    job = get_job(r, job_id)
+    if job is None or job["status"] != QUEUED:
+        return
+    attempts = job["attempts"] + 1
+    r.hset(key, mapping={"status": RUNNING, "attempts": attempts, "startedAt": time.time()})
+    try:
+        # end_event never overwrites attendanceItem rows, so a retry after a
+        # crash halfway through cannot double-insert
+        result = end_event(r, job["eventId"])
+    except Exception as e:
+        print(f"Job {job_id} failed (attempt {attempts}): {e}")
+        status = QUEUED if attempts < JOB_MAX_ATTEMPTS else FAILED
+        with r.pipeline(transaction=True) as pipe:
+            pipe.hset(key, mapping={"status": status, "error": str(e), "finishedAt": time.time()})
+            if status == QUEUED:
+                pipe.lpush(JOB_QUEUE, job_id)
+            pipe.execute()
+        return
+    with r.pipeline(transaction=True) as pipe:
+        pipe.hset(key, mapping={"status": DONE, "result": json.dumps(result), "finishedAt": time.time()})
+        pipe.hdel(key, "error")
+        pipe.expire(key, JOB_TTL)
+        pipe.execute()
+
+def _work(worker):
+    r = redis_connect()
+    processing = _processing_key(worker)
+    while not _stop.is_set():
+        try:
+            job_id = r.blmove(JOB_QUEUE, processing, 1, "RIGHT", "LEFT")
+            if job_id is None:
+                continue
+            try:
+                _run(r, job_id)
+            finally:
+                r.lrem(processing, 1, job_id)
+        except Exception as e:
+            print(f"Job worker error: {e}")
+            _stop.wait(1)
+
+def _renew_leases(r, workers):
+    with r.pipeline(transaction=False) as pipe:
+        for worker in workers:
+            pipe.set(_heartbeat_key(worker), 1, ex=JOB_LEASE)
+        pipe.execute()
+
+def _requeue_expired(r):
+    """
+    Puts the jobs of workers whose heartbeat has expired (their process
+    crashed or was stopped) back on the queue and forgets those workers.
+    """
+    for worker in r.smembers(JOB_WORKER_SET):
+        if r.exists(_heartbeat_key(worker)):
+            continue
+        while True:
+            job_id = r.lmove(_processing_key(worker), JOB_QUEUE, "RIGHT", "LEFT")
+            if job_id is None:
+                break
+            key = _job_key(job_id)
+
+            def reset(pipe):
+                if pipe.hget(key, "status") == RUNNING:
+                    pipe.multi()
+                    pipe.hset(key, "status", QUEUED)
+
+            r.transaction(reset, key)
+        r.srem(JOB_WORKER_SET, worker)
+
+def _heartbeat(workers):
+    r = redis_connect()
+    while not _stop.wait(JOB_LEASE / 3):
+        try:
+            _renew_leases(r, workers)
+            _requeue_expired(r)
+        except Exception as e:
+            print(f"Job heartbeat error: {e}")
+
+def start_job_workers():
+    _stop.clear()
+    r = redis_connect()
+    # Unique per process start, so a restarted process never inherits a list
+    # whose heartbeat its predecessor left behind
+    prefix = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+    names = [f"{prefix}-{i}" for i in range(JOB_WORKERS)]
+    _renew_leases(r, names)
+    if names:
+        r.sadd(JOB_WORKER_SET, *names)
+    _requeue_expired(r)
+    threads = [threading.Thread(target=_heartbeat, args=(names,), name="job-heartbeat", daemon=True)]
+    threads += [threading.Thread(target=_work, args=(name,), name=f"job-worker-{i}", daemon=True)
+                for i, name in enumerate(names)]
+    for thread in threads:
+        thread.start()
+        _workers.append(thread)
+
+def stop_job_workers():
+    _stop.set()
+    for worker in _workers:
+        worker.join(timeout=5)
+    _workers.clear()
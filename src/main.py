@@ -2,19 +2,34 @@
 # Ryan Magnuson <rmagnuson@westmont.edu>
 ## SETUP ##
 import uvicorn
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, StreamingResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 import mysql.connector
 import os
+from datetime import date
 from dotenv import load_dotenv
 from pydantic import BaseModel
-from pymongo import MongoClient
+from src.mongo_connect import get_client, bootstrap_indexes, close_mongo
 from src.event import router as event_router
-from strawberry.fastapi import GraphQLRouter
+from src.graphql_schema.documents import PersistedQueryRouter
 from src.graphql_schema.schema import custom_schema
+from src.graphql_schema.loaders import get_context
 import redis
-from src.attendance import redis_connect, checkin, checkout, get_attendance, get_attendance_count, end_event
-from src.mysql_connect import connect_sql
+from src.attendance import redis_connect, close_redis, checkin, checkout, checkin_many, checkout_many, get_attendance, get_attendance_count
+from src.attendance import open_event, get_absent, NotSignedUp, redis_pool_stats
+from src.jobs import start_job_workers, stop_job_workers, enqueue_finalize, get_job
+from src.attendance_log import start_log_flusher, stop_log_flusher
+from src.mysql_connect import init_pool, close_pool, sql_connection
+from src.cache import cached, EVENTS
+from src.pagination import clamp_page_size
+from src.queries import events_sql, people_sql
+from src.streaming import stream_format, stream_rows, STREAM_FORMATS
+from typing import List, Optional
+from src.db_executor import init_executor, shutdown_executor, run_blocking, ExecutorBusy
+from src.db_executor import stats as executor_stats
+from src.profiling import ProfileMiddleware, PROFILE_TOKEN
+from src.metrics import MetricsMiddleware, MongoPoolListener, Gauge, render as render_metrics
 
 ## API ##
 app = FastAPI()
@@ -26,9 +41,23 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Wraps CORS handling too, so preflights are timed
+app.add_middleware(MetricsMiddleware)
+# Opt-in per-request profiling; not installed at all without PROFILE_TOKEN
+if PROFILE_TOKEN:
+    app.add_middleware(ProfileMiddleware)
+
+@app.exception_handler(ExecutorBusy)
+async def executor_busy_handler(request: Request, exc: ExecutorBusy):
+    return JSONResponse(status_code=503, content={"detail": str(exc)})
+
+@app.exception_handler(NotSignedUp)
+async def not_signed_up_handler(request: Request, exc: NotSignedUp):
+    return JSONResponse(status_code=400, content={"detail": str(exc)})
 
 app.include_router(event_router)
-graphql_app = GraphQLRouter(custom_schema)
+# Accepts persisted query hashes; parsed/validated documents are cached (see documents.py)
+graphql_app = PersistedQueryRouter(custom_schema, context_getter=get_context)
 app.include_router(graphql_app, prefix="/graphql")
 
 ## PYDANTIC ##
@@ -39,13 +68,19 @@ class EventItem(BaseModel):
     event_id: int
 
 
-##GLOBALS##
-cnx = None  # MySQL connection
-mongo_client = None
-mongo_db = None
-event_types_col = None
-event_custom_col = None
+## METRICS ##
+# Pool usage, read whenever /metrics is scraped
+Gauge("app_mysql_pool_connections", "MySQL pool connections by state.", ("state",),
+      lambda: {(k,): v for k, v in init_pool().stats().items()})
+Gauge("app_redis_pool_connections", "Redis pool connections by state.", ("state",),
+      lambda: {(k,): v for k, v in redis_pool_stats().items()})
+Gauge("app_mongo_pool_checked_out", "Mongo connections checked out.", (),
+      lambda: {(): MongoPoolListener.checked_out})
+Gauge("app_db_executor", "DB thread pool: workers, queue depth and calls pending.", ("stat",),
+      lambda: {(k,): v for k, v in executor_stats().items()})
 
+
+##GLOBALS##
 USERNAME = None
 PASSWORD = None
 HOST = None
@@ -79,38 +114,16 @@ def ask_db(q: str):
     try:
         if q.split(" ")[0] != "SELECT" or ';' in q:
             raise Exception("That's not allowed.")
-        crs = cnx.cursor()
-        crs.execute(q)
-        res = crs.fetchall()
-        crs.close()
+        with sql_connection() as cnx:
+            crs = cnx.cursor()
+            crs.execute(q)
+            res = crs.fetchall()
+            crs.close()
 
         return res
     except Exception as e:
         print(f"Error with query: {e}")
 
-#MONGODB##
-
-def connect_mongo():
-    global mongo_client,mongo_db,event_types_col,event_custom_col
-    try:
-        mongo_client = MongoClient(MONGO_URI)
-        mongo_db = mongo_client["finalProj_workorder"]
-
-        # Collections
-        event_types_col = mongo_db["eventTypes"]
-        event_custom_col = mongo_db["eventCustomData"]
-
-        # Indexes
-        event_types_col.create_index("typeId", unique=True)
-        event_custom_col.create_index("meetId", unique=True)
-        event_custom_col.create_index("typeId")
-
-        print(" Connected to MongoDB Atlas!")
-        return mongo_client, mongo_db, event_types_col, event_custom_col
-    except Exception as e:
-        print(f"Error connecting to MongoDB: {e}")
-
-
 ##connect##
 @app.on_event("startup")
 def startup_event():
@@ -118,24 +131,53 @@ def startup_event():
     This runs when uvicorn starts (including in Docker).
     Initializes env, MySQL, Redis, and Mongo.
     """
-    global cnx, r, MONGO_URI
+    global r, MONGO_URI
 
     load_dotenv()
     MONGO_URI = os.getenv("MONGO_URI")
 
+    # Thread pool for blocking DB calls made from async routes/resolvers
+    init_executor()
+
     # MySQL
-    cnx = connect_sql()
-    if cnx:
-        print(" Connected to MySQL in startup_event")
-    else:
+    pool = init_pool()
+    try:
+        with sql_connection():
+            print(f" MySQL pool ready in startup_event (size {pool.size})")
+    except Exception:
         print(" Failed to connect to MySQL in startup_event")
 
     # Redis
     r = redis_connect()
     print(" Connected to Redis in startup_event")
+    # Write-behind of the check-in log into attendanceItem
+    try:
+        start_log_flusher(r)
+    except Exception as e:
+        print(f"Error starting attendance log flusher: {e}")
+    # Workers for queued jobs (end_event finalization)
+    try:
+        start_job_workers()
+    except Exception as e:
+        print(f"Error starting job workers: {e}")
 
-    # Mongo
-    connect_mongo()
+    # Mongo: one shared client; indexes are created once here (or via `python -m src.mongo_connect`)
+    try:
+        get_client()
+        if os.getenv("MONGO_BOOTSTRAP_INDEXES", "1") == "1":
+            bootstrap_indexes()
+        print(" Connected to MongoDB in startup_event")
+    except Exception as e:
+        print(f"Error connecting to MongoDB: {e}")
+
+@app.on_event("shutdown")
+def shutdown_event():
+    stop_job_workers()
+    stop_log_flusher()
+    shutdown_executor()
+    close_pool()
+    close_mongo()
+    close_redis()
 
 
 
@@ -150,98 +192,123 @@ def main():
 #     response = ask_db(q.query)
 #     return response
 
-@app.get("/events/{ep}")
-async def events(ep: str, event: EventItem):
-    crs = cnx.cursor()
-    if ep == "get_active":
-        q = """
-        SELECT * FROM Event e
-        WHERE e.endDate > CURRENT_DATE()
-        """
-        crs.execute(q)
-        res = crs.fetchall()
-        crs.close()
-        return res
+# Route bodies below are blocking; the async routes hand them to the DB
+# thread pool so a slow query never stalls the event loop. Connections are
+# checked out inside those calls, never while a request waits for a thread
+# (or on a cache hit). Both routes can also stream their rows (see
+# src/streaming.py) instead of buffering them.
 
-    elif ep == "get_signees":
-        q = """
-        SELECT * FROM Person p
-        JOIN MeetingSignUpItem m ON m.signeeId = p.personId
-        WHERE m.meetingId = %s
-        """
-        crs.execute(q, (event.event_id,))
+def fetch_rows(q, params):
+    with sql_connection() as cnx:
+        crs = cnx.cursor()
+        crs.execute(q, params)
         res = crs.fetchall()
         crs.close()
-        return res
+    return res
 
-    elif ep == "get_author":
-        q = """
-        SELECT * FROM Person p
-        JOIN Event e ON e.createdByID = p.personId
-        WHERE e.meetId = %s
-        """
-        crs.execute(q, event.event_id)
-        res = crs.fetchall()
-        crs.close()
-        return res
+def query_events(ep: str, event: EventItem, limit=None, after=None):
+    sql = events_sql(ep, event.event_id, limit, after)
+    if sql is None:
+        return None
+    if ep == "get_active":
+        # CURRENT_DATE() moves, so the day is part of the cache key
+        return cached(EVENTS, f"active:{date.today()}:{limit}:{after}", lambda: fetch_rows(*sql))
+    return fetch_rows(*sql)
 
-@app.get("/people/{ep}")
-async def people(ep: str):
-    crs = cnx.cursor()
-    if ep == "students":
-        q = """
-        SELECT * FROM Student s
-        JOIN Person p ON s.personId = p.personId
-        WHERE s.personId = p.personId
-        """
-        crs.execute(q)
-        res = crs.fetchall()
-        crs.close()
-        return res
-    elif ep == "volunteers":
-        q = """
-        SELECT * FROM Volunteer s
-        JOIN Person p ON s.personId = p.personId
-        WHERE s.personId = p.personId
-        """
-        crs.execute(q)
-        res = crs.fetchall()
-        crs.close()
-        return res
-    elif ep == "admins":
-        q = """
-        SELECT * FROM Admin s
-        JOIN Person p ON s.personId = p.personId
-        WHERE s.personId = p.personId
-        """
-        crs.execute(q)
-        res = crs.fetchall()
-        crs.close()
-        return res
+@app.get("/events/{ep}")
+async def events(ep: str, event: EventItem, request: Request, limit: Optional[int] = None,
+                 after: Optional[int] = None):
+    """
+    `limit`/`after` page through get_active (by meetId) and get_signees (by signup id):
+    pass the last key of one page as `after` to get the next. Without `limit` a JSON
+    response holds DEFAULT_PAGE_SIZE rows; streamed formats return every row.
+    """
+    fmt = stream_format(request)
+    if fmt is None or limit is not None:
+        limit = clamp_page_size(limit)
+    if fmt:
+        sql = events_sql(ep, event.event_id, limit, after)
+        if sql is None:
+            raise HTTPException(status_code=404, detail="Page not found")
+        return StreamingResponse(stream_rows(*sql, fmt), media_type=STREAM_FORMATS[fmt])
+    return await run_blocking(query_events, ep, event, limit, after)
+
+def query_people(ep: str, limit=None, after=None):
+    sql = people_sql(ep, limit, after)
+    if sql is None:
+        return None
+    return fetch_rows(*sql)
 
+@app.get("/people/{ep}")
+async def people(ep: str, request: Request, limit: Optional[int] = None, after: Optional[int] = None):
+    """
+    `limit`/`after` page by personId: pass the last personId of one page as `after`.
+    Without `limit` a JSON response holds DEFAULT_PAGE_SIZE rows; streamed formats
+    return every row.
+    """
+    fmt = stream_format(request)
+    if fmt is None or limit is not None:
+        limit = clamp_page_size(limit)
+    if fmt:
+        sql = people_sql(ep, limit, after)
+        if sql is None:
+            raise HTTPException(status_code=404, detail="Page not found")
+        return StreamingResponse(stream_rows(*sql, fmt), media_type=STREAM_FORMATS[fmt])
+    return await run_blocking(query_people, ep, limit, after)
+
+
+@app.get("/metrics")
+def metrics():
+    """
+    Prometheus scrape endpoint: request/resolver latency, backend calls per
+    request and per GraphQL operation, cache hit rates and pool usage.
+    """
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
 
 @app.get("/test-mongo")
 def test_mongo():
     try:
-        if mongo_client is None:
-            raise Exception("MongoDB client not initialized.")
-        mongo_client.admin.command("ping")
+        get_client().admin.command("ping")
         return {"message": "MongoDB connection OK"}
     except Exception as e:
         return {"error": str(e)}
 
 # Redis #
+@app.post("/attendance/batch/{ep}")
+async def redis_post_batch(ep: str, items: List[AttendanceItem]):
+    """
+    Batch check-in/check-out for kiosk scanners, where "ep" is "checkin" or
+    "checkout". Each item reports whether it changed the student's state, and
+    whether the student is signed up (check-ins for open events only).
+    """
+    if any(a.student_id is None for a in items):
+        raise HTTPException(status_code=400, detail="Every item needs a student_id")
+    pairs = [(a.event_id, a.student_id) for a in items]
+    if ep == "checkin":
+        changed = await run_blocking(checkin_many, r, pairs)
+    elif ep == "checkout":
+        changed = await run_blocking(checkout_many, r, pairs)
+    else:
+        raise HTTPException(status_code=404, detail="Page not found")
+    return [{"event_id": a.event_id, "student_id": a.student_id, "changed": bool(c), "signed_up": c is not None}
+            for a, c in zip(items, changed)]
+
 @app.post("/attendance/{ep}")
 async def redis_post(ep: str, a: AttendanceItem):
     """
     Handles posts to Redis, where "ep" is "endpoint"
     """
     if ep == "checkin":
-        checkin(r, a.event_id, a.student_id)
+        await run_blocking(checkin, r, a.event_id, a.student_id)
     elif ep == "checkout":
-        checkout(r, a.event_id, a.student_id)
+        await run_blocking(checkout, r, a.event_id, a.student_id)
+    elif ep == "open_event":
+        return {"roster": await run_blocking(open_event, r, a.event_id)}
     elif ep == "end_event":
-        end_event(r, a.event_id)
+        # Finalizing a big event can outlast proxy timeouts, so it runs as a
+        # job; poll GET /jobs/{job_id} for the result
+        job = await run_blocking(enqueue_finalize, r, a.event_id)
+        return JSONResponse(status_code=202, content=job)
     else:
         raise HTTPException(status_code=404, detail="Page not found")
 
@@ -251,12 +318,25 @@ async def redis_get(ep: str, a: AttendanceItem):
     Handles "get" requests from Redis, where "ep" is "endpoint"
     """
     if ep == "get":
-        return get_attendance(r, a.event_id) # student_id unneeded (?)
+        return await run_blocking(get_attendance, r, a.event_id) # student_id unneeded (?)
     elif ep == "get_count":
-        return get_attendance_count(r, a.event_id)
+        return await run_blocking(get_attendance_count, r, a.event_id)
+    elif ep == "absent":
+        return await run_blocking(get_absent, r, a.event_id)
     else:
         raise HTTPException(status_code=404, detail="Page not found")
 
+@app.get("/jobs/{job_id:path}")
+async def job_status(job_id: str):
+    """
+    Status of a background job: queued, running, done (with its result) or
+    failed (with the last error).
+    """
+    job = await run_blocking(get_job, r, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
 ## MAIN ##
 # if __name__ == '__main__':
 #     load_dotenv()
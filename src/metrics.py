@@ -0,0 +1,375 @@
+import bisect
+import inspect
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+import redis
+from graphql import FieldNode, OperationDefinitionNode
+from redis.client import Pipeline
+from pymongo import monitoring
+from strawberry.extensions import SchemaExtension
+
+# In-process metrics, rendered in the Prometheus text format by render() and
+# served at GET /metrics. Every MySQL statement, Mongo command and Redis round
+# trip goes through record_call(), which times it and counts it against the
+# current query scope: one per HTTP request (MetricsMiddleware) and one per
+# GraphQL operation (MetricsExtension). Scopes nest, so an operation's queries
+# also count towards its request.
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250, 1000)
+COST_BUCKETS = (10, 50, 100, 500, 1000, 5000, 10000, 50000, 100000, 1000000)
+BACKENDS = ("mysql", "mongo", "redis")
+
+_metrics = []
+
+
+def _labels(names, values):
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{str(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class Counter:
+    def __init__(self, name, help, labelnames=()):
+        self.name, self.help, self.labelnames = name, help, labelnames
+        self._values = {}
+        self._lock = threading.Lock()
+        _metrics.append(self)
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.labelnames, labels)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name, self.help, self.labelnames, self.buckets = name, help, labelnames, buckets
+        # labels -> [count per bucket (non-cumulative, last is +Inf), sum, count]
+        self._values = {}
+        self._lock = threading.Lock()
+        _metrics.append(self)
+
+    def observe(self, value, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        names = self.labelnames + ("le",)
+        with self._lock:
+            for labels, (bucket_counts, total, count) in sorted(self._values.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets + ("+Inf",), bucket_counts):
+                    cumulative += bucket_count
+                    lines.append(f"{self.name}_bucket{_labels(names, labels + (bound,))} {cumulative}")
+                lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {total}")
+                lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {count}")
+        return lines
+
+
+class Gauge:
+    """
+    Read at scrape time: collect() returns {label values tuple: value}.
+    """
+    def __init__(self, name, help, labelnames, collect):
+        self.name, self.help, self.labelnames, self.collect = name, help, labelnames, collect
+        _metrics.append(self)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        try:
+            values = self.collect()
+        except Exception as e:
+            print(f"Error collecting {self.name}: {e}")
+            return lines
+        for labels, value in sorted(values.items()):
+            lines.append(f"{self.name}{_labels(self.labelnames, labels)} {value}")
+        return lines
+
+
+def render():
+    lines = []
+    for metric in _metrics:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+REQUESTS = Counter("app_requests_total", "HTTP requests by route and status.", ("method", "endpoint", "status"))
+REQUEST_SECONDS = Histogram("app_request_duration_seconds", "HTTP request latency by route.", ("method", "endpoint"))
+REQUEST_QUERIES = Histogram("app_request_queries", "Backend calls made by one HTTP request.",
+                            ("method", "endpoint", "backend"), QUERY_BUCKETS)
+OPERATION_QUERIES = Histogram("app_graphql_operation_queries", "Backend calls made by one GraphQL operation, by root fields.",
+                              ("operation", "backend"), QUERY_BUCKETS)
+RESOLVER_SECONDS = Histogram("app_graphql_resolver_duration_seconds", "GraphQL resolver latency by field.", ("field",))
+BACKEND_SECONDS = Histogram("app_backend_call_duration_seconds", "Latency of each MySQL statement, Mongo command or Redis round trip.",
+                            ("backend", "command"))
+BACKEND_ERRORS = Counter("app_backend_call_errors_total", "Backend calls that raised.", ("backend", "command"))
+CACHE_REQUESTS = Counter("app_cache_requests_total", "Cache lookups by cache and result (hit, miss, error).", ("cache", "result"))
+POOL_WAIT_SECONDS = Histogram("app_mysql_pool_wait_seconds", "Time spent checking a connection out of the MySQL pool.")
+OPERATION_COST = Histogram("app_graphql_operation_cost", "Static cost computed for each GraphQL operation.", (), COST_BUCKETS)
+COST_REJECTIONS = Counter("app_graphql_cost_rejections_total", "GraphQL operations refused by the cost limits, by error code.", ("code",))
+
+
+## QUERY SCOPES ##
+class QueryCounts:
+    """
+    Backend calls made inside one scope. Calls may come from several DB
+    threads at once, so updates take a lock.
+    """
+    def __init__(self, parent=None):
+        self.parent = parent
+        self.counts = dict.fromkeys(BACKENDS, 0)
+        self._lock = threading.Lock()
+
+    def add(self, backend):
+        scope = self
+        while scope is not None:
+            with scope._lock:
+                scope.counts[backend] += 1
+            scope = scope.parent
+
+
+_scope = ContextVar("metrics_scope", default=None)
+
+
+@contextmanager
+def query_scope():
+    """
+    Counts backend calls made in the block (and in DB threads it starts via
+    run_blocking, which carries the context along).
+    """
+    counts = QueryCounts(_scope.get())
+    token = _scope.set(counts)
+    try:
+        yield counts
+    finally:
+        _scope.reset(token)
+
+
+def record_call(backend, command, seconds, failed=False):
+    BACKEND_SECONDS.observe(seconds, backend, command)
+    if failed:
+        BACKEND_ERRORS.inc(backend, command)
+    counts = _scope.get()
+    if counts is not None:
+        counts.add(backend)
+
+
+@contextmanager
+def timed_call(backend, command):
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        record_call(backend, command, time.perf_counter() - start, failed=True)
+        raise
+    record_call(backend, command, time.perf_counter() - start)
+
+
+## MYSQL ##
+class InstrumentedCursor:
+    """
+    Proxy around a mysql.connector cursor that times execute/executemany.
+    The command label is the statement's first keyword (SELECT, INSERT...).
+    """
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._cursor.close()
+
+    def execute(self, operation, *args, **kwargs):
+        with timed_call("mysql", _statement_type(operation)):
+            return self._cursor.execute(operation, *args, **kwargs)
+
+    def executemany(self, operation, *args, **kwargs):
+        with timed_call("mysql", _statement_type(operation)):
+            return self._cursor.executemany(operation, *args, **kwargs)
+
+
+def _statement_type(operation):
+    words = operation.split(None, 1)
+    return words[0].upper() if words else "EMPTY"
+
+
+## MONGO ##
+class MongoCommandListener(monitoring.CommandListener):
+    """
+    pymongo calls these synchronously in the thread running the command, so
+    the current query scope is the one that issued it.
+    """
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        record_call("mongo", event.command_name, event.duration_micros / 1e6)
+
+    def failed(self, event):
+        record_call("mongo", event.command_name, event.duration_micros / 1e6, failed=True)
+
+
+class MongoPoolListener(monitoring.ConnectionPoolListener):
+    """
+    Tracks Mongo connections checked out across all servers.
+    """
+    checked_out = 0
+
+    def connection_checked_out(self, event):
+        MongoPoolListener.checked_out += 1
+
+    def connection_checked_in(self, event):
+        MongoPoolListener.checked_out -= 1
+
+    def pool_created(self, event): pass
+    def pool_ready(self, event): pass
+    def pool_cleared(self, event): pass
+    def pool_closed(self, event): pass
+    def connection_created(self, event): pass
+    def connection_ready(self, event): pass
+    def connection_closed(self, event): pass
+    def connection_check_out_started(self, event): pass
+    def connection_check_out_failed(self, event): pass
+
+
+## REDIS ##
+class InstrumentedPipeline(Pipeline):
+    """
+    A whole pipeline/MULTI is one round trip; commands run immediately while
+    WATCHing (inside r.transaction) are one each.
+    """
+    def execute(self, raise_on_error=True):
+        with timed_call("redis", "MULTI" if self.transaction else "PIPELINE"):
+            return super().execute(raise_on_error)
+
+    def immediate_execute_command(self, *args, **options):
+        with timed_call("redis", str(args[0]).upper()):
+            return super().immediate_execute_command(*args, **options)
+
+
+class InstrumentedRedis(redis.Redis):
+    def execute_command(self, *args, **options):
+        with timed_call("redis", str(args[0]).upper()):
+            return super().execute_command(*args, **options)
+
+    def pipeline(self, transaction=True, shard_hint=None):
+        return InstrumentedPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+
+
+## HTTP ##
+class MetricsMiddleware:
+    """
+    ASGI middleware recording latency, status and backend calls per route
+    (the route's path template, so ids in URLs don't explode label counts).
+    Timing covers the whole response, including streamed bodies.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        with query_scope() as counts:
+            try:
+                await self.app(scope, receive, send_with_status)
+            finally:
+                route = scope.get("route")
+                endpoint = route.path if route is not None else "unmatched"
+                method = scope["method"]
+                REQUESTS.inc(method, endpoint, status)
+                REQUEST_SECONDS.observe(time.perf_counter() - start, method, endpoint)
+                for backend, count in counts.counts.items():
+                    REQUEST_QUERIES.observe(count, method, endpoint, backend)
+
+
+## GRAPHQL ##
+class MetricsExtension(SchemaExtension):
+    """
+    Counts backend calls per operation, labelled by its sorted root fields
+    (bounded by the schema, unlike client-chosen operation names), and times
+    root resolvers plus any nested resolver that awaits (loaders, offloaded
+    calls). Plain attribute fields are not timed. Operations that never got
+    to execute (parse or validation errors) all count as "invalid".
+    """
+    executed = False
+
+    def on_operation(self):
+        with query_scope() as counts:
+            yield
+        operation = _root_fields(self.execution_context) if self.executed else "invalid"
+        for backend, count in counts.counts.items():
+            OPERATION_QUERIES.observe(count, operation, backend)
+
+    def on_execute(self):
+        # Only reached once the document parsed and validated
+        self.executed = True
+        yield
+
+    def resolve(self, _next, root, info, *args, **kwargs):
+        start = time.perf_counter()
+        result = _next(root, info, *args, **kwargs)
+        field = f"{info.parent_type.name}.{info.field_name}"
+        if inspect.isawaitable(result):
+            return _timed_resolver(result, field, start)
+        if info.parent_type.name in ("Query", "Mutation"):
+            RESOLVER_SECONDS.observe(time.perf_counter() - start, field)
+        return result
+
+
+async def _timed_resolver(awaitable, field, start):
+    try:
+        return await awaitable
+    finally:
+        RESOLVER_SECONDS.observe(time.perf_counter() - start, field)
+
+
+def _root_fields(execution_context):
+    document = execution_context.graphql_document
+    if document is None:
+        return "invalid"
+    for definition in document.definitions:
+        if not isinstance(definition, OperationDefinitionNode):
+            continue
+        name = definition.name.value if definition.name else None
+        if execution_context.operation_name and name != execution_context.operation_name:
+            continue
+        root = execution_context.schema._schema.get_root_type(definition.operation)
+        if root is None:
+            return "invalid"
+        names = sorted({selection.name.value for selection in definition.selection_set.selections
+                        if isinstance(selection, FieldNode) and selection.name.value in root.fields})
+        return ",".join(names) or "none"
+    return "none"
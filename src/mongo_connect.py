@@ -0,0 +1,71 @@
+import os
+import threading
+from dotenv import load_dotenv
+from pymongo import MongoClient
+from src.metrics import MongoCommandListener, MongoPoolListener
+
+MONGO_DB = "finalProj_workorder"
+EVENT_TYPES = "eventTypes"
+EVENT_CUSTOM_DATA = "eventCustomData"
+
+# collection name -> list of (keys, options) passed to create_index
+INDEXES = {
+    EVENT_TYPES: [("typeId", {"unique": True})],
+    EVENT_CUSTOM_DATA: [("meetId", {"unique": True}), ("typeId", {})],
+}
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """
+    Returns the process-wide MongoClient, creating it on first use.
+    MongoClient is thread-safe and keeps its own connection pool.
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            load_dotenv()
+            _client = MongoClient(
+                os.getenv("MONGO_URI"),
+                maxPoolSize=int(os.getenv("MONGO_POOL_SIZE", "50")),
+                event_listeners=[MongoCommandListener(), MongoPoolListener()],
+            )
+        return _client
+
+
+def get_collection(name):
+    return get_client()[MONGO_DB][name]
+
+
+def connect_mongo():
+    """
+    Returns the shared (eventTypes, eventCustomData) collections.
+    No new client or index commands are issued per call.
+    """
+    return get_collection(EVENT_TYPES), get_collection(EVENT_CUSTOM_DATA)
+
+
+def bootstrap_indexes():
+    """
+    Creates the indexes in INDEXES. Idempotent; run once at startup or by hand
+    with `python -m src.mongo_connect`.
+    """
+    for name, indexes in INDEXES.items():
+        collection = get_collection(name)
+        for keys, options in indexes:
+            collection.create_index(keys, **options)
+
+
+def close_mongo():
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+            _client = None
+
+
+if __name__ == "__main__":
+    bootstrap_indexes()
+    print(" MongoDB indexes bootstrapped")
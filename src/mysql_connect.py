@@ -1,23 +1,197 @@
 import mysql.connector
 import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
 from dotenv import load_dotenv
+from src.metrics import InstrumentedCursor, POOL_WAIT_SECONDS
 
-def connect_sql():
-    try:
-        load_dotenv()
 
-        USERNAME = os.getenv("USERNAME")
-        PASSWORD = os.getenv("PASSWORD")
-        HOST = os.getenv("HOST")
-        DB = os.getenv("DB")
+class PoolTimeout(Exception):
+    """
+    Raised when no pooled MySQL connection frees up within the checkout timeout.
+    """
+
+
+class PooledConnection:
+    """
+    Thin proxy around a checked-out mysql.connector connection.
+    Calling close() hands the connection back to the pool instead of
+    tearing down the socket, so existing `cnx.close()` calls keep working.
+    """
+    def __init__(self, pool, cnx):
+        self._pool = pool
+        self._cnx = cnx
+
+    def __getattr__(self, name):
+        if self._cnx is None:
+            raise AttributeError(f"Connection already returned to pool (accessed '{name}')")
+        return getattr(self._cnx, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def cursor(self, *args, **kwargs):
+        if self._cnx is None:
+            raise AttributeError("Connection already returned to pool (accessed 'cursor')")
+        return InstrumentedCursor(self._cnx.cursor(*args, **kwargs))
+
+    def close(self):
+        if self._cnx is not None:
+            cnx, self._cnx = self._cnx, None
+            self._pool.release(cnx)
+
+
+class ConnectionPool:
+    """
+    Fixed-size, thread-safe MySQL connection pool.
+
+    Connections are opened lazily up to `size`. On checkout a connection that
+    has sat idle longer than `ping_after` seconds is pinged (and reconnected if
+    the server dropped it). Callers wait at most `timeout` seconds for a free
+    connection before PoolTimeout is raised.
+    """
+    def __init__(self, size, timeout, ping_after, **connect_args):
+        self.size = size
+        self.timeout = timeout
+        self.ping_after = ping_after
+        self._connect_args = connect_args
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self._opened = 0
+        self._closed = False
+
+    def _connect(self):
+        return mysql.connector.connect(**self._connect_args)
+
+    def _healthy(self, cnx, idle_since):
+        if time.monotonic() - idle_since < self.ping_after:
+            return True
+        try:
+            cnx.ping(reconnect=True, attempts=1)
+            return True
+        except mysql.connector.Error:
+            return False
+
+    def get_connection(self, timeout=None):
+        if self._closed:
+            raise PoolTimeout("MySQL pool is closed")
+        wait = self.timeout if timeout is None else timeout
+        start = time.perf_counter()
+        acquired = self._slots.acquire(timeout=wait)
+        POOL_WAIT_SECONDS.observe(time.perf_counter() - start)
+        if not acquired:
+            raise PoolTimeout(f"No MySQL connection available after {wait}s (pool size {self.size})")
+        try:
+            while True:
+                try:
+                    cnx, idle_since = self._idle.get_nowait()
+                except queue.Empty:
+                    cnx = self._connect()
+                    with self._lock:
+                        self._opened += 1
+                    break
+                if self._healthy(cnx, idle_since):
+                    break
+                self._discard(cnx)
+        except Exception:
+            self._slots.release()
+            raise
+        return PooledConnection(self, cnx)
 
-        cnx = mysql.connector.connect(
-            user=USERNAME,
-            password=PASSWORD,
-            host=HOST,
-            database=DB
-        )
+    def release(self, cnx):
+        try:
+            if self._closed or not cnx.is_connected():
+                self._discard(cnx)
+                return
+            if cnx.in_transaction:
+                cnx.rollback()
+            self._idle.put((cnx, time.monotonic()))
+        except mysql.connector.Error:
+            self._discard(cnx)
+        finally:
+            self._slots.release()
 
-        return cnx
+    def _discard(self, cnx):
+        with self._lock:
+            self._opened -= 1
+        try:
+            cnx.close()
+        except Exception:
+            pass
+
+    def stats(self):
+        """
+        Snapshot of pool usage: configured size, sockets opened, idle and checked out.
+        """
+        idle = self._idle.qsize()
+        return {"size": self.size, "opened": self._opened, "idle": idle, "in_use": self._opened - idle}
+
+    def close(self):
+        self._closed = True
+        while True:
+            try:
+                cnx, _ = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(cnx)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def init_pool():
+    """
+    Builds the process-wide pool from the environment. Safe to call repeatedly.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            load_dotenv()
+            _pool = ConnectionPool(
+                size=int(os.getenv("MYSQL_POOL_SIZE", "20")),
+                timeout=float(os.getenv("MYSQL_POOL_TIMEOUT", "5")),
+                ping_after=float(os.getenv("MYSQL_POOL_PING_AFTER", "5")),
+                user=os.getenv("USERNAME"),
+                password=os.getenv("PASSWORD"),
+                host=os.getenv("HOST"),
+                database=os.getenv("DB"),
+            )
+        return _pool
+
+
+def close_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+
+
+def connect_sql():
+    """
+    Checks a connection out of the shared pool. `cnx.close()` returns it.
+    """
+    try:
+        return init_pool().get_connection()
     except Exception as e:
-        print(f"Error connecting to DB: {e}")
\ No newline at end of file
+        print(f"Error connecting to DB: {e}")
+        raise
+
+
+@contextmanager
+def sql_connection():
+    """
+    Scoped checkout: the connection goes back to the pool when the block exits.
+    """
+    cnx = connect_sql()
+    try:
+        yield cnx
+    finally:
+        cnx.close()
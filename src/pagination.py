@@ -0,0 +1,32 @@
+import os
+from typing import Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DEFAULT_PAGE_SIZE = int(os.getenv("DEFAULT_PAGE_SIZE", "50"))
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "500"))
+
+# Keyset (seek) pagination: pages are ordered by a unique integer key and the
+# next page starts after the last key seen, so deep pages cost the same as
+# the first one (no OFFSET scan).
+
+def clamp_page_size(first: Optional[int]) -> int:
+    if first is None:
+        return DEFAULT_PAGE_SIZE
+    return max(1, min(first, MAX_PAGE_SIZE))
+
+def keyset_clause(key: str, limit: Optional[int] = None, after: Optional[int] = None, has_where: bool = False):
+    """
+    SQL to append to a query for one page ordered by `key`, plus its params.
+    Without limit/after only the ORDER BY is added.
+    """
+    sql, params = "", []
+    if after is not None:
+        sql += f" {'AND' if has_where else 'WHERE'} {key} > %s"
+        params.append(after)
+    sql += f" ORDER BY {key}"
+    if limit is not None:
+        sql += " LIMIT %s"
+        params.append(limit)
+    return sql, tuple(params)
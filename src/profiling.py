@@ -0,0 +1,139 @@
+import cProfile
+import functools
+import hmac
+import json
+import os
+import pstats
+import threading
+import time
+import uuid
+from contextvars import ContextVar
+from urllib.parse import parse_qs
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# On-demand profiling of single requests. Send the X-Profile-Token header (or
+# ?profile=<token>) matching PROFILE_TOKEN and the request runs under cProfile:
+# the event-loop part (routing, Strawberry parsing/validation, async
+# resolvers) and every call it hands to the DB thread pool, each in its own
+# profiler merged in at the end. The response carries X-Profile-Id and the
+# profile lands in PROFILE_DIR as {id}.prof (pstats, e.g. for snakeviz) plus
+# {id}.json (wall/CPU time and the top functions).
+#
+# With PROFILE_TOKEN unset main.py doesn't install the middleware at all.
+# Only one request is profiled at a time; the event-loop profiler also sees
+# any other request the loop interleaves while this one awaits.
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN") or None
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_HEADER = b"x-profile-token"
+PROFILE_TOP = 40
+
+_active = ContextVar("active_profile", default=None)
+_busy = threading.Lock()
+
+
+class RequestProfile:
+    def __init__(self):
+        self.id = uuid.uuid4().hex
+        self.main = cProfile.Profile()
+        self.workers = []
+        self.worker_cpu = 0.0
+        self._lock = threading.Lock()
+
+    def add_worker(self, profiler, cpu):
+        with self._lock:
+            self.workers.append(profiler)
+            self.worker_cpu += cpu
+
+
+def in_profile(fn):
+    """
+    fn unchanged, or, inside a profiled request, fn wrapped to run under its
+    own profiler (cProfile only sees the thread it was enabled in).
+    """
+    profile = _active.get()
+    if profile is None:
+        return fn
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        profiler = cProfile.Profile()
+        cpu = time.thread_time()
+        profiler.enable()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            profiler.disable()
+            profile.add_worker(profiler, time.thread_time() - cpu)
+    return wrapper
+
+
+def _requested(scope):
+    token = None
+    for name, value in scope["headers"]:
+        if name == PROFILE_HEADER:
+            token = value.decode("latin-1")
+            break
+    if token is None and b"profile=" in scope.get("query_string", b""):
+        token = parse_qs(scope["query_string"].decode("latin-1")).get("profile", [None])[0]
+    return token is not None and hmac.compare_digest(token, PROFILE_TOKEN)
+
+
+def save_profile(profile, scope, wall, cpu):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    stats = pstats.Stats(profile.main)
+    for worker in profile.workers:
+        stats.add(worker)
+    stats.dump_stats(os.path.join(PROFILE_DIR, f"{profile.id}.prof"))
+
+    top = []
+    stats.sort_stats("cumulative")
+    for (filename, line, function) in stats.fcn_list[:PROFILE_TOP]:
+        calls, _, own, cumulative, _ = stats.stats[(filename, line, function)]
+        top.append({"function": f"{filename}:{line}({function})", "calls": calls,
+                    "own_ms": round(own * 1000, 3), "cumulative_ms": round(cumulative * 1000, 3)})
+    summary = {"id": profile.id, "method": scope["method"], "path": scope["path"],
+               "wall_ms": round(wall * 1000, 3), "cpu_ms": round(cpu * 1000, 3),
+               "db_thread_calls": len(profile.workers), "top": top}
+    with open(os.path.join(PROFILE_DIR, f"{profile.id}.json"), "w") as f:
+        json.dump(summary, f, indent=2)
+
+
+class ProfileMiddleware:
+    """
+    ASGI middleware profiling requests that carry the profile token.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not _requested(scope):
+            return await self.app(scope, receive, send)
+        if not _busy.acquire(blocking=False):
+            # cProfile allows one active profiler per thread
+            return await self.app(scope, receive, _with_header(send, b"x-profile-skipped", b"busy"))
+
+        profile = RequestProfile()
+        token = _active.set(profile)
+        wall, cpu = time.perf_counter(), time.thread_time()
+        profile.main.enable()
+        try:
+            await self.app(scope, receive, _with_header(send, b"x-profile-id", profile.id.encode()))
+        finally:
+            profile.main.disable()
+            wall, cpu = time.perf_counter() - wall, time.thread_time() - cpu + profile.worker_cpu
+            _active.reset(token)
+            _busy.release()
+            try:
+                save_profile(profile, scope, wall, cpu)
+            except Exception as e:
+                print(f"Error saving profile {profile.id}: {e}")
+
+
+def _with_header(send, name, value):
+    async def wrapped(message):
+        if message["type"] == "http.response.start":
+            message = dict(message, headers=list(message.get("headers", [])) + [(name, value)])
+        await send(message)
+    return wrapped
@@ -0,0 +1,141 @@
+from functools import lru_cache
+from typing import Optional, Sequence
+from src.pagination import keyset_clause
+
+# SQL for the hot MySQL queries. The REST routes, the GraphQL resolvers,
+# attendance.end_event and db/explain_check.py all build their statements
+# here, so the EXPLAIN check looks at exactly what the app runs. Nothing in
+# this module touches a connection.
+
+## REST ##
+def events_sql(ep: str, event_id: int, limit=None, after=None):
+    """
+    SQL and params behind /events/{ep}, or None for an unknown endpoint.
+    """
+    if ep == "get_active":
+        q = """
+        SELECT * FROM Event e
+        WHERE e.endDate > CURRENT_DATE()
+        """
+        page_sql, params = keyset_clause("e.meetId", limit, after, has_where=True)
+        return q + page_sql, params
+
+    elif ep == "get_signees":
+        q = """
+        SELECT * FROM Person p
+        JOIN MeetingSignUpItem m ON m.signeeId = p.personId
+        WHERE m.meetingId = %s
+        """
+        page_sql, params = keyset_clause("m.id", limit, after, has_where=True)
+        return q + page_sql, (event_id,) + params
+
+    elif ep == "get_author":
+        q = """
+        SELECT * FROM Person p
+        JOIN Event e ON e.createdByID = p.personId
+        WHERE e.meetId = %s
+        """
+        return q, (event_id,)
+
+def people_sql(ep: str, limit=None, after=None):
+    """
+    SQL and params behind /people/{ep}, or None for an unknown endpoint.
+    """
+    page_sql, params = keyset_clause("p.personId", limit, after, has_where=True)
+    if ep == "students":
+        q = """
+        SELECT * FROM Student s
+        JOIN Person p ON s.personId = p.personId
+        WHERE s.personId = p.personId
+        """
+        return q + page_sql, params
+    elif ep == "volunteers":
+        q = """
+        SELECT * FROM Volunteer s
+        JOIN Person p ON s.personId = p.personId
+        WHERE s.personId = p.personId
+        """
+        return q + page_sql, params
+    elif ep == "admins":
+        q = """
+        SELECT * FROM Admin s
+        JOIN Person p ON s.personId = p.personId
+        WHERE s.personId = p.personId
+        """
+        return q + page_sql, params
+
+
+## GRAPHQL ##
+# Event field -> (column, table it needs joined to Event e). Resolvers only
+# select the columns for the fields requested and only join what those need;
+# meetId is always fetched since it keys pages and nested loaders.
+EVENT_COLUMNS = {
+    "meetId": ("e.meetId", None),
+    "title": ("m.title", "Meeting"),
+    "createdByID": ("e.createdByID", None),
+    "typeId": ("e.typeId", None),
+    "location": ("e.location", None),
+    "startDate": ("e.startDate", None),
+    "endDate": ("e.endDate", None),
+    "type": ("et.typeName AS type", "eventType"),
+}
+EVENT_JOINS = {
+    "Meeting": "JOIN Meeting m ON m.meetId = e.meetId",
+    "eventType": "JOIN eventType et ON e.typeId = et.typeId",
+}
+
+@lru_cache(maxsize=None)
+def event_select(shape: tuple) -> str:
+    """
+    SELECT ... FROM for one selection shape. Cached per shape; there are at
+    most 2^7 of them.
+    """
+    columns = ", ".join(EVENT_COLUMNS[field][0] for field in shape)
+    tables = {EVENT_COLUMNS[field][1] for field in shape}
+    joins = "".join(f" {join}" for table, join in EVENT_JOINS.items() if table in tables)
+    return f"SELECT {columns} FROM Event e{joins}"
+
+def signups_sql(meeting_id: int, limit: Optional[int] = None, after: Optional[int] = None):
+    """
+    SQL and params for one page of a meeting's signups, ordered by id.
+    """
+    q = "SELECT id, signeeId, signedUpById, meetingId FROM MeetingSignUpItem WHERE meetingId = %s"
+    page_sql, params = keyset_clause("id", limit, after, has_where=True)
+    return q + page_sql, (meeting_id,) + params
+
+PAST_ATTENDANCE_SQL = """
+    SELECT msi.signeeId, ai.STATUS
+    FROM attendanceItem ai
+    JOIN MeetingSignUpItem msi ON ai.signupId = msi.id
+    WHERE msi.meetingId = %s
+"""
+
+
+## END EVENT ##
+def roster_absents_sql(event_id: int, signee_ids: Sequence[int]):
+    """
+    SELECT of the Absent rows for signees still missing from an open event's
+    Redis roster; end_event inserts its result.
+    """
+    q = f"""
+        SELECT id, 'Absent'
+        FROM MeetingSignUpItem
+        WHERE meetingId = %s AND signeeId IN ({", ".join(["%s"] * len(signee_ids))})
+    """
+    return q, (event_id, *signee_ids)
+
+# Signees of a closed event that have no attendanceItem row yet
+UNMARKED_ABSENTS_SQL = """
+    SELECT msi.id, 'Absent'
+    FROM MeetingSignUpItem msi
+    LEFT JOIN attendanceItem ai ON ai.signupId = msi.id
+    WHERE msi.meetingId = %s AND ai.id IS NULL
+"""
+
+ATTENDANCE_COUNTS_SQL = """
+    SELECT ai.STATUS, COUNT(*)
+    FROM attendanceItem ai
+    JOIN MeetingSignUpItem msi ON ai.signupId = msi.id
+    WHERE msi.meetingId = %s
+    GROUP BY ai.STATUS
+"""
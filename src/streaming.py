@@ -0,0 +1,68 @@
+import csv
+import io
+import json
+import os
+from dotenv import load_dotenv
+from src.mysql_connect import sql_connection
+
+load_dotenv()
+
+STREAM_CHUNK_SIZE = int(os.getenv("STREAM_CHUNK_SIZE", "1000"))
+
+# ?format=<key> -> response media type
+STREAM_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+def stream_format(request):
+    """
+    Picks a streaming format from ?format=ndjson|csv or an
+    `Accept: application/x-ndjson` header. None means a normal JSON response.
+    """
+    fmt = request.query_params.get("format")
+    if fmt in STREAM_FORMATS:
+        return fmt
+    if STREAM_FORMATS["ndjson"] in request.headers.get("accept", ""):
+        return "ndjson"
+    return None
+
+def stream_rows(q, params, fmt):
+    """
+    Generator yielding query results as NDJSON lines or CSV rows. Reads from an
+    unbuffered cursor STREAM_CHUNK_SIZE rows at a time, so memory stays flat no
+    matter how many rows the query returns. The pooled connection is checked
+    out when the response starts sending and held until the stream ends.
+    """
+    with sql_connection() as cnx:
+        yield from _stream_rows(cnx, q, params, fmt)
+
+def _stream_rows(cnx, q, params, fmt):
+    crs = cnx.cursor(buffered=False)
+    try:
+        crs.execute(q, params)
+        columns = crs.column_names
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        if fmt == "csv":
+            writer.writerow(columns)
+            yield buf.getvalue()
+
+        while True:
+            rows = crs.fetchmany(STREAM_CHUNK_SIZE)
+            if not rows:
+                break
+            buf.seek(0)
+            buf.truncate()
+            if fmt == "csv":
+                writer.writerows(rows)
+            else:
+                for row in rows:
+                    buf.write(json.dumps(dict(zip(columns, row)), default=str))
+                    buf.write("\n")
+            yield buf.getvalue()
+    finally:
+        # A client that disconnects mid-stream leaves unread rows behind
+        if cnx.unread_result:
+            cnx.consume_results()
+        crs.close()